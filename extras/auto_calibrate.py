@@ -4,8 +4,9 @@ Auto-calibrate: Camera calibration utility
 1. Takes a still image every X seconds. Prompts you with a countdown between each.
 2. From the resulting images, selects N images, checking each in turn that it shows
    the checkboard.
-3. From that set of stills, it calculates camera parameters and saves them to a
-   pickled object for later use in undistortion operations.
+3. From that set of stills, it calculates camera parameters and saves them to
+   params.npz (with precomputed undistortion maps) for later use in
+   undistortion operations.
 4. Optionally, shows a preview of unwarping a random calibration photo using the
    calculated lens parameters
 
@@ -13,7 +14,7 @@ Params:
 i = interval between captures, default 3
 t = total number of photos to capture, default 40
 n = min number of checkerboard photos to process, default 15
-o = output dir for calibration images and pickled props, default './auto_calibrate/*'
+o = output dir for calibration images and params.npz, default './auto_calibrate/*'
 c = camera source, default is built-in webcam
 p = Dewarp a test image and display a preview, default True
 z = Skip image capture, just process previously captured calibration images, default False
@@ -26,10 +27,16 @@ import cv2
 import glob
 import imutils
 import os
-import pickle
 import random
+import sys
 from time import sleep
 
+# If you've `git cloned` the repo and are running the examples locally
+# you'll need the next line so that Python can find the robovision library
+# Otherwise, comment out the sys.path... line
+sys.path.append(os.path.dirname(os.path.realpath('.')))
+import robovision as rv  # noqa: E402
+
 cam = None
 messages = {
     'intro': 'Beginning image capture',
@@ -79,13 +86,6 @@ def main():
     calibrate(output_dir, num_images, args['preview'])
 
 
-class Object(object):
-    """
-    Generic / ad-hoc object constructor
-    """
-    pass
-
-
 def show_message(key):
     # shows a message from the messages dict
     if key in messages:
@@ -252,16 +252,11 @@ def calibrate(dirname, min_images, preview):
     print("frame = video_stream.read_frame()")
     print("frame = robovision.flatten(frame, cam_matrix, dist_coeff)\n")
 
-    # Save the params for future re-use
-    camera_params = Object()
-    camera_params.mtx = mtx
-    camera_params.dist = dist
-    camera_params.img_size = (w, h)
-
-    param_file_name = os.path.join(dirname, 'params.pickle')
-    with open(param_file_name, 'wb') as param_file:
-        pickle.dump(camera_params, param_file)
-        print('Camera params also saved to {}'.format(param_file_name))
+    # Save the params, and the undistortion maps for this image size, for
+    # future re-use
+    param_file_name = os.path.join(dirname, 'params.npz')
+    rv.save_camera_params(param_file_name, mtx, dist, (w, h), include_maps=True)
+    print('Camera params also saved to {}'.format(param_file_name))
 
 
 if __name__ == '__main__':
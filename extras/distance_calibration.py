@@ -35,7 +35,7 @@ def main():
         print("Invalid source")
         exit()
     vs.start()
-    # params = rv.load_camera_params('params.pickle')
+    # params = rv.load_camera_params('params.npz')
     cv2.namedWindow('CapturedImage', cv2.WINDOW_NORMAL)
     while True:
         frame = vs.read_frame()
@@ -40,7 +40,7 @@ def main():
     vs.start()
     cv2.namedWindow('CapturedImage', cv2.WINDOW_NORMAL)
     target = rv.Target()
-    # params = rv.load_camera_params('params.pickle')
+    # params = rv.load_camera_params('params.npz')
     while True:
         frame = vs.read_frame()
         # frame = rv.flatten(frame, params)
@@ -39,7 +39,7 @@ def main():
     cv2.namedWindow('CapturedImage', cv2.WINDOW_NORMAL)
     target = rv.Target()
     target.set_color_range(lower=(100, 0, 240), upper=(130, 20, 255))
-    # params = rv.load_camera_params('params.pickle')
+    # params = rv.load_camera_params('params.npz')
     while True:
         frame = vs.read_frame()
         # frame = rv.flatten(frame, params)
@@ -40,7 +40,7 @@ def main():
     cv2.namedWindow("Thresholded", cv2.WINDOW_NORMAL)
     target = rv.Target()
     target.set_color_range(lower=(0, 0, 255), upper=(0, 0, 255))
-    # params = rv.load_camera_params("params.pickle")
+    # params = rv.load_camera_params("params.npz")
     while True:
         frame = vs.read_frame()
         gray = cv2.cvtColor(frame, cv2.COLOR_BGR2GRAY)
@@ -10,7 +10,6 @@ import argparse
 import cv2
 import numpy as np
 import os
-import pickle
 import sys
 import textwrap
 # If you've `git cloned` the repo and are running the examples locally
@@ -85,15 +84,11 @@ def main():
             cv2.destroyAllWindows()
             exit()
         if key == ord("s"):
-            # Save the params to a pickle file
-            camera_params = Object()
-            camera_params.mtx = cam_matrix
-            camera_params.dist = dist_coeff
-            camera_params.img_size = (width, height)
-            param_file_name = os.path.join(os.path.expanduser("~"), "params.pickle")
-            with open(param_file_name, "wb") as param_file:
-                pickle.dump(camera_params, param_file)
-                print("Camera params saved to {}".format(param_file_name))
+            # Save the params, with undistortion maps for this image size
+            param_file_name = os.path.join(os.path.expanduser("~"), "params.npz")
+            rv.save_camera_params(param_file_name, cam_matrix, dist_coeff, (width, height),
+                                  include_maps=True)
+            print("Camera params saved to {}".format(param_file_name))
             cv2.destroyAllWindows()
             exit()
 
@@ -187,19 +182,12 @@ def print_help():
         when the auto_calibrate script fails to properly detect those parameters.
 
         When you're satisfied with the dewarping, press "S" while one of the preview
-        windows is active to save your lens parameters to a pickle file.
+        windows is active to save your lens parameters to ~/params.npz.
 
         Or, press "P" to print the lens parameters as code you can copy and paste
         into your script.
         '''))
 
 
-class Object(object):
-    """
-    Generic / ad-hoc object constructor
-    """
-    pass
-
-
 if __name__ == "__main__":
     main()
@@ -12,16 +12,30 @@ process could run a targeting routine, while another streams a camera feed
 to the DriverStation. Typically, you'd need subprocesses to monitor the FMSInfo
 NetworkTable for a signal from the FMS that the game has started or ended to
 control the other subprocesses.
+
+Frames travel through a SharedFrameRing: CamGrabber resizes each frame
+straight into shared memory and only the (slot, seq) pair goes through the
+queue, so frames are never pickled or copied between processes.
 """
 import cv2
-import imutils
+import os
+import sys
 import time
 from multiprocessing import Process, Queue
+from queue import Empty
+# If you've `git cloned` the repo and are running the examples locally
+# you'll need the next line so that Python can find the robovision library
+# Otherwise, comment out the sys.path... line
+sys.path.append(os.path.dirname(os.path.realpath('.')))
+import robovision as rv  # noqa: E402
+
+FRAME_SIZE = (320, 240)
 
 
 class CamGrabber(Process):
-    def __init__(self, queue=None, stop_queue=None, **kwargs):
+    def __init__(self, ring=None, queue=None, stop_queue=None, **kwargs):
         super(CamGrabber, self).__init__()
+        self.ring = ring
         self.queue = queue
         self.stop_queue = stop_queue
         self.kwargs = kwargs
@@ -32,8 +46,9 @@ class CamGrabber(Process):
         while keepGoing:
             success, frame = cam.read()
             if success:
-                frame = imutils.resize(frame, width=320)
-                self.queue.put(frame)
+                slot, buffer = self.ring.next_slot()
+                cv2.resize(frame, FRAME_SIZE, dst=buffer, interpolation=cv2.INTER_AREA)
+                self.queue.put((slot, self.ring.commit(slot)))
             else:
                 print("frame fail {}".format(success))
             if self.stop_queue.empty() is False:
@@ -41,13 +56,15 @@ class CamGrabber(Process):
                 if stop == 1:
                     print("CamGrabber exiting")
                     cam.release()
+                    self.ring.close()
                     keepGoing = False
                     break
 
 
 class FrameProcessor(Process):
-    def __init__(self, queue=None, stop_queue=None, **kwargs):
+    def __init__(self, ring=None, queue=None, stop_queue=None, **kwargs):
         super(FrameProcessor, self).__init__()
+        self.ring = ring
         self.queue = queue
         self.stop_queue = stop_queue
         self.kwargs = kwargs
@@ -55,39 +72,47 @@ class FrameProcessor(Process):
     def run(self):
         keepGoing = True
         while keepGoing:
-            if self.queue.empty() is False:
-                f = self.queue.get()
-                if f is not None:
-                    adjusted = cv2.addWeighted(f,
-                                               1. + float(40) / 127.,
-                                               f,
-                                               float(1),
-                                               float(60) - float(40))
-
+            try:
+                # block for the next frame rather than polling queue.empty()
+                slot, seq = self.queue.get(timeout=0.1)
+            except Empty:
+                slot, seq = None, None
+            f = self.ring.get(slot, seq) if slot is not None else None
+            if f is not None:
+                adjusted = cv2.addWeighted(f,
+                                           1. + float(40) / 127.,
+                                           f,
+                                           float(1),
+                                           float(60) - float(40))
+                # skip the frame if the grabber lapped us while we worked on it
+                if self.ring.is_valid(slot, seq):
                     cv2.imshow("Adjusted", adjusted)
             if cv2.waitKey(1) & 0xFF == ord("q"):
                 print("FrameProcessor exiting")
                 self.stop_queue.put(1)
                 cv2.destroyAllWindows()
+                self.ring.close()
                 keepGoing = False
                 break
 
 
 if __name__ == "__main__":
+    ring = rv.SharedFrameRing(shape=(FRAME_SIZE[1], FRAME_SIZE[0], 3), slots=4)
     q = Queue()
     cg_stop_queue = Queue()
     stop_queue = Queue()
-    cg = CamGrabber(queue=q, stop_queue=cg_stop_queue)
-    fp = FrameProcessor(queue=q, stop_queue=stop_queue)
+    cg = CamGrabber(ring=ring, queue=q, stop_queue=cg_stop_queue)
+    fp = FrameProcessor(ring=ring, queue=q, stop_queue=stop_queue)
     cg.start()
     fp.start()
     while True:
-        if stop_queue.empty() is False:
-            stop = stop_queue.get()
-            if stop == 1:
-                print("Signaling CamGrabber to exit")
-                cg.stop_queue.put(1)
-                fp.terminate()
-                time.sleep(2)
-                cg.terminate()
-                exit()
+        stop = stop_queue.get()
+        if stop == 1:
+            print("Signaling CamGrabber to exit")
+            cg.stop_queue.put(1)
+            fp.terminate()
+            time.sleep(2)
+            cg.terminate()
+            ring.close()
+            ring.unlink()
+            exit()
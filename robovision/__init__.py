@@ -1,22 +1,63 @@
-# Core functions accessed like robovision.resize()
-from .core import adjust_brightness           # noqa # pylint: disable=unused-import
-from .core import adjust_brightness_contrast  # noqa # pylint: disable=unused-import
-from .core import adjust_contrast             # noqa # pylint: disable=unused-import
-from .core import detect_edges                # noqa # pylint: disable=unused-import
-from .core import equalize                    # noqa # pylint: disable=unused-import
-from .core import flatten                     # noqa # pylint: disable=unused-import
-from .core import get_video_stream            # noqa # pylint: disable=unused-import
-from .core import load_camera_params          # noqa # pylint: disable=unused-import
-from .core import resize                      # noqa # pylint: disable=unused-import
-from .core import resize_raw                  # noqa # pylint: disable=unused-import
-# Overlays
-from .overlay import draw_arrow               # noqa # pylint: disable=unused-import
-from .overlay import draw_border              # noqa # pylint: disable=unused-import
-from .overlay import draw_crosshairs          # noqa # pylint: disable=unused-import
-from .overlay import draw_text                # noqa # pylint: disable=unused-import
-
-# Sub-libraries accessed like robovision.video_stream.function_name()
-from .deck import Deck                        # noqa # pylint: disable=unused-import
-from .preprocessor import Preprocessor        # noqa # pylint: disable=unused-import
-from .target import Target                    # noqa # pylint: disable=unused-import
-from .video_stream import VideoStream         # noqa # pylint: disable=unused-import
+
+# Submodules are imported the first time one of their names is used (e.g.
+# robovision.resize imports core, and OpenCV with it), so importing
+# robovision itself is quick. Names map to (submodule, attribute), or to
+# (submodule, None) for the submodule itself.
+import importlib
+
+_lazy = {
+    # Core functions accessed like robovision.resize()
+    "adjust_brightness": (".core", "adjust_brightness"),
+    "adjust_brightness_contrast": (".core", "adjust_brightness_contrast"),
+    "adjust_contrast": (".core", "adjust_contrast"),
+    "adjust_gamma": (".core", "adjust_gamma"),
+    "detect_edges": (".core", "detect_edges"),
+    "equalize": (".core", "equalize"),
+    "flatten": (".core", "flatten"),
+    "get_clahe": (".core", "get_clahe"),
+    "get_video_stream": (".core", "get_video_stream"),
+    "load_camera_params": (".core", "load_camera_params"),
+    "resize": (".core", "resize"),
+    "resize_raw": (".core", "resize_raw"),
+    "CameraParams": (".camera_params", "CameraParams"),
+    "convert_camera_params": (".camera_params", "convert_camera_params"),
+    "save_camera_params": (".camera_params", "save_camera_params"),
+    # Overlays
+    "draw_arrow": (".overlay", "draw_arrow"),
+    "draw_border": (".overlay", "draw_border"),
+    "draw_crosshairs": (".overlay", "draw_crosshairs"),
+    "draw_text": (".overlay", "draw_text"),
+
+    # Sub-libraries accessed like robovision.video_stream.function_name()
+    "Deck": (".deck", "Deck"),
+    "Frame": (".frame", "Frame"),
+    "Pipeline": (".pipeline_spec", "Pipeline"),
+    "load_pipeline": (".pipeline_spec", "load_pipeline"),
+    "point_ops": (".point_ops", None),
+    "Preprocessor": (".preprocessor", "Preprocessor"),
+    "Pyramid": (".pyramid", "Pyramid"),
+    "SharedFrameRing": (".shared_frames", "SharedFrameRing"),
+    "Target": (".target", "Target"),
+    "Undistorter": (".undistort", "Undistorter"),
+    "undistort_points": (".undistort", "undistort_points"),
+    "VideoStream": (".video_stream", "VideoStream"),
+    "VideoStreamGroup": (".video_stream_group", "VideoStreamGroup"),
+}
+
+__all__ = sorted(_lazy)
+
+
+def __getattr__(name):
+    try:
+        module_name, attr = _lazy[name]
+    except KeyError:
+        raise AttributeError("module {!r} has no attribute {!r}".format(__name__, name)) from None
+    module = importlib.import_module(module_name, __name__)
+    value = module if attr is None else getattr(module, attr)
+    # later lookups find it directly, without coming back here
+    globals()[name] = value
+    return value
+
+
+def __dir__():
+    return sorted(set(globals()) | set(_lazy))
@@ -0,0 +1,236 @@
+"""
+Camera calibration files
+
+Camera parameters (camera matrix, distortion coefficients, image size) are
+saved as .npz, or .json to be edited by hand, rather than pickled. Pickles
+could only be loaded if the class they were saved from was importable,
+and unpickling an untrusted file can run arbitrary code.
+
+An .npz file can also hold the undistortion maps for the calibrated image
+size, so flatten() has nothing to compute at startup. The file is stored
+uncompressed and its arrays are memory-mapped rather than read, so loading
+is nearly instant however large the maps are. The last few files loaded
+are cached, so loading the same one again returns the same parameters
+unless it has changed since.
+
+rv.save_camera_params("params.npz", mtx, dist, (640, 480), include_maps=True)
+params = rv.load_camera_params("params.npz")
+frame = rv.flatten(frame, params)
+
+Old params.pickle files still load, and convert_camera_params() turns
+them into .npz files. They're read by an unpickler that only accepts the
+parameters object and numpy arrays, and refuses anything else.
+
+Author: Tim Poulsen
+Web site: https://timpoulsen.com
+Copyright 2018, Tim Poulsen, all rights reserved
+License: MIT
+"""
+import json
+import numpy as np
+import os
+import pickle
+import threading
+import zipfile
+from collections import OrderedDict
+from .undistort import Undistorter
+
+# (path, mmap) -> (modification time, CameraParams), least recently used first
+_cache = OrderedDict()
+_cache_size = 4
+_cache_lock = threading.Lock()
+
+
+class CameraParams(object):
+    def __init__(self, mtx, dist, img_size=None, maps=None):
+        """
+        :param mtx: 3x3 camera matrix
+        :param dist: Distortion coefficients
+        :param img_size: Optional, (width, height) the camera was calibrated at
+        :param maps: Optional, (map1, map2, new camera matrix, roi) undistortion
+                     maps for img_size, as from Undistorter.maps()
+        """
+        self.mtx = np.asarray(mtx, dtype=np.float64)
+        self.dist = np.asarray(dist, dtype=np.float64)
+        self.img_size = tuple(int(v) for v in img_size) if img_size is not None else None
+        self.maps = maps
+        self._undistorter = None
+
+    def undistorter(self):
+        """
+        The Undistorter for these parameters, created once and seeded with
+        any maps stored in the file
+
+        :return: Undistorter
+        """
+        if self._undistorter is None:
+            undistorter = Undistorter(self.mtx, self.dist)
+            if self.maps is not None and self.img_size is not None:
+                undistorter.add_maps(self.img_size, *self.maps)
+            self._undistorter = undistorter
+        return self._undistorter
+
+
+def save_camera_params(path, mtx, dist, img_size=None, include_maps=False):
+    """
+    Save camera parameters as .npz or .json (by the file's extension)
+
+    :param path: File to write
+    :param mtx: 3x3 camera matrix
+    :param dist: Distortion coefficients
+    :param img_size: Optional, (width, height) the camera was calibrated at
+    :param include_maps: Also store the undistortion maps for img_size
+                         (.npz only), so they needn't be computed at startup
+    :return: path
+    """
+    params = CameraParams(mtx, dist, img_size)
+    if os.path.splitext(path)[1].lower() == ".json":
+        with open(path, "w") as f:
+            json.dump({"mtx": params.mtx.tolist(), "dist": params.dist.ravel().tolist(),
+                       "img_size": params.img_size}, f, indent=2)
+        return path
+    arrays = {"mtx": params.mtx, "dist": params.dist}
+    if params.img_size is not None:
+        arrays["img_size"] = np.array(params.img_size)
+        if include_maps:
+            map1, map2, new_matrix, roi = params.undistorter().maps(params.img_size)
+            arrays.update(map1=map1, map2=map2, new_mtx=new_matrix, roi=np.array(roi))
+    # uncompressed, so the arrays can be memory-mapped when loading
+    with open(path, "wb") as f:
+        np.savez(f, **arrays)
+    return path
+
+
+def load_camera_params(params_file, mmap=True):
+    '''
+    Loads the camera parameters (determined by auto_calibrate.py) in
+    the instance for use for flatten() operations
+
+    :param params_file: .npz or .json file written by save_camera_params(),
+                        or a pickle file created by older versions of
+                        auto_calibrate.py
+    :param mmap: Memory-map arrays in .npz files rather than reading them
+    :return: CameraParams, or None if the file doesn't hold camera parameters
+    '''
+    path = os.path.abspath(params_file)
+    key = path, mmap
+    mtime = os.path.getmtime(path)
+    with _cache_lock:
+        cached = _cache.get(key)
+        if cached is not None and cached[0] == mtime:
+            _cache.move_to_end(key)
+            return cached[1]
+        # a changed file replaces its old entry
+        params = _load(path, mmap)
+        _cache[key] = mtime, params
+        _cache.move_to_end(key)
+        while len(_cache) > _cache_size:
+            _cache.popitem(last=False)
+        return params
+
+
+def convert_camera_params(pickle_file, params_file=None, include_maps=True):
+    """
+    Convert a params.pickle file from older versions of auto_calibrate.py
+
+    :param pickle_file: Pickle file to read
+    :param params_file: Optional, .npz or .json file to write; defaults to
+                        the pickle's name with an .npz extension
+    :param include_maps: Also store undistortion maps, see save_camera_params()
+    :return: Path of the file written
+    """
+    params = _load_pickle(pickle_file)
+    if params is None:
+        raise ValueError("{} doesn't contain camera parameters".format(pickle_file))
+    if params_file is None:
+        params_file = os.path.splitext(pickle_file)[0] + ".npz"
+    return save_camera_params(params_file, params.mtx, params.dist, params.img_size,
+                              include_maps=include_maps)
+
+
+def _load(path, mmap):
+    extension = os.path.splitext(path)[1].lower()
+    if extension == ".json":
+        with open(path) as f:
+            data = json.load(f)
+        return CameraParams(data["mtx"], data["dist"], data.get("img_size"))
+    if extension == ".npz":
+        data = _load_npz(path, mmap)
+        maps = None
+        if "map1" in data:
+            maps = (data["map1"], data["map2"], np.array(data["new_mtx"]),
+                    tuple(int(v) for v in data["roi"]))
+        return CameraParams(data["mtx"], data["dist"], data.get("img_size"), maps)
+    return _load_pickle(path)
+
+
+def _load_npz(path, mmap):
+    """
+    Load an uncompressed .npz, memory-mapping each array in place
+    """
+    if not mmap:
+        with np.load(path) as data:
+            return dict(data)
+    arrays = {}
+    with zipfile.ZipFile(path) as archive, open(path, "rb") as f:
+        for info in archive.infolist():
+            if info.compress_type != zipfile.ZIP_STORED:
+                # can't map compressed data; read it instead
+                with np.load(path) as data:
+                    return dict(data)
+            # the member's data follows its local header, whose name and
+            # extra field lengths may differ from the central directory's
+            f.seek(info.header_offset + 26)
+            name_length, extra_length = np.frombuffer(f.read(4), dtype="<u2")
+            f.seek(info.header_offset + 30 + int(name_length) + int(extra_length))
+            if np.lib.format.read_magic(f) == (1, 0):
+                shape, fortran_order, dtype = np.lib.format.read_array_header_1_0(f)
+            else:
+                shape, fortran_order, dtype = np.lib.format.read_array_header_2_0(f)
+            arrays[os.path.splitext(info.filename)[0]] = np.memmap(
+                f, dtype=dtype, mode="r", shape=shape, offset=f.tell(),
+                order="F" if fortran_order else "C")
+    return arrays
+
+
+class _LegacyParams(object):
+    pass
+
+
+# the globals a pickled numpy array refers to, with numpy 1 and 2 names,
+# and the Python 2 style names protocols 0-2 also use
+_legacy_globals = {
+    ("numpy.core.multiarray", "_reconstruct"),
+    ("numpy._core.multiarray", "_reconstruct"),
+    ("numpy.core.numeric", "_frombuffer"),
+    ("numpy._core.numeric", "_frombuffer"),
+    ("numpy", "ndarray"),
+    ("numpy", "dtype"),
+    ("copyreg", "_reconstructor"),
+    ("copy_reg", "_reconstructor"),
+    ("__builtin__", "object"),
+    ("builtins", "object"),
+    ("_codecs", "encode"),
+}
+
+
+class _LegacyUnpickler(pickle.Unpickler):
+    """
+    Loads old pickles without the class they were saved from, which was
+    defined in the calibration script itself (__main__.Object), allowing
+    nothing but that and numpy arrays
+    """
+    def find_class(self, module, name):
+        if name == "Object":
+            return _LegacyParams
+        if (module, name) in _legacy_globals:
+            return super(_LegacyUnpickler, self).find_class(module, name)
+        raise pickle.UnpicklingError("{}.{} isn't allowed in camera params".format(module, name))
+
+
+def _load_pickle(path):
+    with open(path, "rb") as f:
+        params = _LegacyUnpickler(f).load()
+    if not hasattr(params, "mtx"):
+        return None
+    return CameraParams(params.mtx, params.dist, getattr(params, "img_size", None))
@@ -9,22 +9,34 @@ License: MIT
 TODO: Add color extraction functions: average, dominant, top-five, etc colors
 """
 import cv2
-import pickle
-import robovision as rv
+import numpy as np
+import os
+import threading
+from . import point_ops
+from .camera_params import CameraParams, load_camera_params  # noqa # pylint: disable=unused-import
+from .frame import Frame
+from .undistort import Undistorter
 
-clahe = cv2.createCLAHE(clipLimit=2.0, tileGridSize=(8, 8))
+# CLAHE objects keep per-call state, so each thread gets its own
+_clahe_cache = threading.local()
+# Undistorters used by flatten(), keyed by camera parameters
+_undistorters = {}
 
 
 def get_video_stream(source):
+    # imported here so that core doesn't load the video stack
+    from .video_stream import VideoStream
     vs = None
     try:
         webcam = int(source)
-        vs = rv.VideoStream(source="webcam", cam_id=webcam)
+        vs = VideoStream(source="webcam", cam_id=webcam)
     except ValueError:
         if source == "picam":
-            vs = rv.VideoStream(source="picam")
+            vs = VideoStream(source="picam")
         elif type(source) is str and source.startswith("http"):
-            vs = rv.VideoStream(source="ipcam", ipcam_url=source)
+            vs = VideoStream(source="ipcam", ipcam_url=source)
+        elif type(source) is str and os.path.exists(source):
+            vs = VideoStream(source="file", file_path=source)
     return vs
 
 
@@ -33,6 +45,9 @@ def resize(image, width=None, height=None):
     Resize an image while maintaining its aspect ratio; specify either
     target width or height of the image (with width taking precedence).
 
+    The result is always a new image; for a cached one shared by everything
+    using the same Frame, see Frame.resized().
+
     :param image: OpenCV BGR image
     :param width: Integer new width of the image
     :param height: Integer new height of the image
@@ -77,12 +92,16 @@ def resize_raw(image, width=None, height=None):
 
 def adjust_brightness_contrast(image, brightness=0., contrast=0.):
     """
-    Adjust the brightness and/or contrast of an image
+    Adjust the brightness and/or contrast of an image. 8-bit images are
+    mapped through a cached lookup table (see point_ops), which gives the
+    same result as the blend used for other image types.
 
     :param image: OpenCV BGR image
     :param contrast: Float, contrast adjustment with 0 meaning no change
     :param brightness: Float, brightness adjustment with 0 meaning no change
     """
+    if image.dtype == np.uint8:
+        return point_ops.apply_lut(image, point_ops.brightness_contrast_lut(brightness, contrast))
     beta = 0
     # See the OpenCV docs for more info on the `beta` parameter to addWeighted
     # https://docs.opencv.org/3.4.2/d2/de8/group__core__array.html#gafafb2513349db3bcff51f54ee5592a19
@@ -115,17 +134,72 @@ def adjust_contrast(image, contrast=0.):
     return adjust_brightness_contrast(image, brightness=0., contrast=contrast)
 
 
-def equalize(image):
+def adjust_gamma(image, gamma=1.):
     """
-    Image equalization function of the lAB representation of the image.
+    Apply gamma correction to an 8-bit image
 
     :param image: OpenCV BGR image
-    :return: Equalized BGR image
+    :param gamma: Positive float where values above 1 brighten the mid-tones
+    :return: Adjusted BGR image
+    """
+    return point_ops.apply_lut(image, point_ops.gamma_lut(gamma))
+
+
+def get_clahe(clip_limit=2.0, tile_grid_size=(8, 8)):
+    """
+    A CLAHE (contrast limited adaptive histogram equalization) object for
+    the calling thread. OpenCV's CLAHE objects can't safely be shared
+    between threads, so one is created per thread and settings, then reused.
+
+    :param clip_limit: Float, contrast limit for each tile
+    :param tile_grid_size: Tuple, number of tiles across and down
+    :return: cv2.CLAHE
+    """
+    key = float(clip_limit), tuple(tile_grid_size)
+    cache = getattr(_clahe_cache, "instances", None)
+    if cache is None:
+        cache = _clahe_cache.instances = {}
+    clahe = cache.get(key)
+    if clahe is None:
+        clahe = cache[key] = cv2.createCLAHE(clipLimit=key[0], tileGridSize=key[1])
+    return clahe
+
+
+def equalize(image, clip_limit=2.0, tile_grid_size=(8, 8), luminance_only=False, scale=1):
+    """
+    Image equalization function of the lAB representation of the image.
+    Grayscale images are equalized directly. Safe to call from any thread.
+
+    :param image: OpenCV BGR or grayscale image, or Frame
+    :param clip_limit: Float, CLAHE contrast limit
+    :param tile_grid_size: Tuple, CLAHE tiles across and down
+    :param luminance_only: Return just the equalized lightness plane, a
+                           grayscale image ready for thresholding, and skip
+                           converting back to BGR
+    :param scale: Integer, shrink the image by this factor first; the result
+                  is the smaller size, and much cheaper to compute
+    :return: Equalized BGR image, or grayscale plane
     """
-    image_lab = cv2.cvtColor(image, cv2.COLOR_BGR2LAB)
-    lab_planes = cv2.split(image_lab)
-    lab_planes[0] = clahe.apply(lab_planes[0])
-    image_lab = cv2.merge(lab_planes)
+    if scale > 1:
+        h, w = image.shape[:2]
+        if isinstance(image, Frame):
+            image = image.resized(width=w // scale)
+        else:
+            image = cv2.resize(image, (w // scale, h // scale), interpolation=cv2.INTER_AREA)
+    clahe = get_clahe(clip_limit, tile_grid_size)
+    if image.ndim == 2 or image.shape[2] == 1:
+        return clahe.apply(image)
+    if isinstance(image, Frame):
+        image_lab = image.lab
+    else:
+        image_lab = cv2.cvtColor(image, cv2.COLOR_BGR2LAB)
+    lightness = clahe.apply(cv2.extractChannel(image_lab, 0))
+    if luminance_only:
+        return lightness
+    if isinstance(image, Frame):
+        # the Frame's LAB image is shared; don't change it
+        image_lab = image_lab.copy()
+    cv2.insertChannel(lightness, image_lab, 0)
     return cv2.cvtColor(image_lab, cv2.COLOR_LAB2BGR)
 
 
@@ -149,45 +223,38 @@ def detect_edges(image,
     return cv2.Canny(image, min_val, max_val, aperture_size)
 
 
-def load_camera_params(params_file):
-    '''
-    Loads the camera parameters (determined by auto_calibrate.py) in
-    the instance for use for flatten() operations
-
-    :param params_file: pickle file created by auto_calibrate.py
-    '''
-    params = pickle.load(open(params_file, "rb"))
-    if isinstance(params, Object) and hasattr(params, 'mtx'):
-        # looks to be a valid camera parameters pickle file
-        return params
-    return None
-
-
-def flatten(image, cam_matrix, dist_coeff):
+def flatten(image, cam_matrix, dist_coeff=None):
     '''
     Removes lens distortions using the camera/lens parameters and
-    distortion coefficients
+    distortion coefficients. The undistortion maps are computed on the
+    first call for each set of parameters and frame size and then reused;
+    see Undistorter to control cropping and scaling.
 
     :param image: OpenCV BGR image to flatten
+    :param cam_matrix: Camera matrix, or the parameters returned by
+                       load_camera_params() (then omit dist_coeff)
+    :param dist_coeff: Distortion coefficients
     :return: Undistorted BGR image
     '''
-    h, w = image.shape[:2]
-    newcameramtx, _ = \
-        cv2.getOptimalNewCameraMatrix(cam_matrix,
-                                      dist_coeff,
-                                      (w, h),
-                                      1,
-                                      (w, h))
-    return cv2.undistort(image,
-                         cam_matrix,
-                         dist_coeff,
-                         None,
-                         newcameramtx)
+    if dist_coeff is None:
+        if isinstance(cam_matrix, CameraParams):
+            # uses any maps stored with the parameters
+            return cam_matrix.undistorter().undistort(image)
+        cam_matrix, dist_coeff = cam_matrix.mtx, cam_matrix.dist
+    cam_matrix = np.asarray(cam_matrix, dtype=np.float64)
+    dist_coeff = np.asarray(dist_coeff, dtype=np.float64)
+    key = cam_matrix.tobytes() + dist_coeff.tobytes()
+    undistorter = _undistorters.get(key)
+    if undistorter is None:
+        if len(_undistorters) >= 8:
+            _undistorters.clear()
+        undistorter = _undistorters[key] = Undistorter(cam_matrix, dist_coeff)
+    return undistorter.undistort(image)
 
 
 class Object(object):
     """
-    An empty, generic object constructor required for de-pickling
-    the camera parameters file
+    An empty, generic object constructor formerly required for de-pickling
+    the camera parameters file; kept for code that still refers to it
     """
     pass
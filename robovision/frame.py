@@ -0,0 +1,137 @@
+"""
+A video frame that remembers the images derived from it
+
+Frame is a numpy array (so it can be passed anywhere an image can) that
+also computes its HSV, grayscale, LAB and resized versions on first use
+and keeps them. When several detectors each need the HSV version of the
+same frame, the conversion is done once rather than once per detector.
+
+frame = rv.Frame(image, seq=vs.last_seq)
+mask = cv2.inRange(frame.hsv, lower, upper)
+edges = cv2.Canny(frame.gray, 50, 100)
+small = frame.resized(width=160)  # also a Frame, see also frame.pyramid
+
+Derived images are worked out from the frame as it was when they were
+first requested, and are shared; treat both the frame and them as
+read-only. New images made from a Frame (copies, slices, arithmetic)
+start out with nothing cached, and anything that isn't an image of the
+same shape (reductions like mean(), comparisons like frame > 0) comes back
+as a plain numpy array.
+
+Author: Tim Poulsen
+Web site: https://timpoulsen.com
+Copyright 2018, Tim Poulsen, all rights reserved
+License: MIT
+"""
+import cv2
+import numpy as np
+import threading
+from .pyramid import Pyramid
+
+
+# guards creating a frame's own lock, which is only done on first use
+_init_lock = threading.Lock()
+
+
+class Frame(np.ndarray):
+    # views, slices and copies get these defaults, so making them costs
+    # nothing extra; the cache and its lock are created by derive()
+    seq = None
+    _derived = None
+    _lock = None
+
+    def __new__(cls, image, seq=None):
+        """
+        :param image: BGR (or single channel grayscale) image
+        :param seq: Optional, sequence number of the frame in its stream
+        :return: Frame sharing the image's data
+        """
+        frame = np.asarray(image).view(cls)
+        frame.seq = seq
+        return frame
+
+    def __array_wrap__(self, array, context=None, return_scalar=False):
+        if array.dtype == np.bool_ or array.shape != self.shape:
+            # not an image, e.g. a mask or a reduction
+            array = array.view(np.ndarray)
+            return array[()] if return_scalar else array
+        return super(Frame, self).__array_wrap__(array, context)
+
+    def __reduce__(self):
+        # pickle as a plain array; the cache is cheap to rebuild
+        return Frame, (self.image, self.seq)
+
+    @property
+    def image(self):
+        """
+        The frame as a plain numpy array, without copying
+        """
+        return self.view(np.ndarray)
+
+    @property
+    def hsv(self):
+        return self.convert(cv2.COLOR_BGR2HSV)
+
+    @property
+    def gray(self):
+        if self.ndim == 2:
+            return self.image
+        return self.convert(cv2.COLOR_BGR2GRAY)
+
+    @property
+    def lab(self):
+        return self.convert(cv2.COLOR_BGR2LAB)
+
+    def convert(self, code):
+        """
+        The frame converted with cv2.cvtColor, computed once
+
+        :param code: OpenCV color conversion code, e.g. cv2.COLOR_BGR2YCrCb
+        :return: Converted image
+        """
+        return self.derive(("convert", code), lambda image: cv2.cvtColor(image, code))
+
+    @property
+    def pyramid(self):
+        """
+        The frame's Pyramid, which makes each size of it once and smaller
+        sizes from larger ones
+        """
+        return self.derive("pyramid", Pyramid)
+
+    def resized(self, width=None, height=None):
+        """
+        The frame resized maintaining its aspect ratio (see robovision.resize),
+        computed once, from the frame's pyramid. The result is shared;
+        copy it (or use robovision.resize) before drawing on it.
+
+        :param width: Integer new width of the image
+        :param height: Integer new height of the image
+        :return: Resized Frame, with its own cache
+        """
+        return self.derive(("resize", width, height),
+                           lambda image: Frame(self.pyramid.resize(width=width, height=height),
+                                               seq=self.seq))
+
+    def derive(self, key, func):
+        """
+        Compute something from the frame once and remember it. Concurrent
+        callers asking for the same key wait for the first one's result.
+
+        :param key: Hashable name for the result
+        :param func: Function taking the frame as a plain array
+        :return: func's result
+        """
+        if self._lock is None:
+            with _init_lock:
+                if self._lock is None:
+                    self._derived = {}
+                    # reentrant, since deriving one result can derive another
+                    self._lock = threading.RLock()
+        derived = self._derived.get(key)
+        if derived is None:
+            with self._lock:
+                derived = self._derived.get(key)
+                if derived is None:
+                    derived = self._derived[key] = func(self.image)
+        return derived
@@ -0,0 +1,22 @@
+"""
+Image file helpers, shared by file replay (Filecam) and Preprocessor
+
+Author: Tim Poulsen
+Web site: https://timpoulsen.com
+Copyright 2018, Tim Poulsen, all rights reserved
+License: MIT
+"""
+import os
+
+image_extensions = ".bmp", ".jpeg", ".jpg", ".png", ".tif", ".tiff"
+
+
+def list_images(directory):
+    """
+    The image files in a directory, by extension, in filename order
+
+    :param directory: Path of the directory
+    :return: List of file paths
+    """
+    return sorted(os.path.join(directory, f) for f in os.listdir(directory)
+                  if os.path.splitext(f)[1].lower() in image_extensions)
@@ -0,0 +1,284 @@
+"""
+Declarative pipelines
+
+Describe a Preprocessor and Target as data (a dict, or a JSON or YAML
+file) rather than code, so a pipeline can be tuned without editing the
+robot program. The whole spec is checked when it's loaded, so a typo fails
+at startup rather than on the field.
+
+{
+    "preprocessor": {
+        "image_size": null,
+        "optimize": true,
+        "roi": [0, 0, 320, 120],
+        "stages": [
+            {"func": "resize", "kwargs": {"width": 320}},
+            {"func": "cv2.GaussianBlur", "args": [[5, 5], 0], "dst": true}
+        ]
+    },
+    "target": {
+        "lower": [60, 100, 100],
+        "upper": [90, 255, 255],
+        "track": true,
+        "sort_method": "area"
+    }
+}
+
+Stage functions are robovision's image functions ("resize", "equalize",
+see stage_functions) or OpenCV ones ("cv2.cvtColor"). Strings naming OpenCV constants, such as
+"cv2.COLOR_BGR2HSV", are replaced by their values, and lists by tuples.
+Both sections are optional.
+
+The first frames through a pipeline are much slower than the rest while
+OpenCV allocates buffers and sets up kernels. Call warm_up() with the
+camera's resolution before the match starts so that happens on synthetic
+frames rather than the first real one.
+
+pipeline = rv.load_pipeline("pipeline.yaml")
+pipeline.warm_up((320, 240))
+contours = pipeline.process(frame)
+
+A Pipeline can also be built directly to warm up an existing Preprocessor
+and/or Target: rv.Pipeline(preprocessor=pp, target=target).warm_up(...)
+
+Loading YAML requires PyYAML (pip install pyyaml).
+
+Author: Tim Poulsen
+Web site: https://timpoulsen.com
+Copyright 2018, Tim Poulsen, all rights reserved
+License: MIT
+"""
+import cv2
+import inspect
+import json
+import numpy as np
+import os
+from . import core
+from .preprocessor import Preprocessor
+from .target import Target
+
+sort_methods = ("none", "area", "area_asc", "left-to-right", "right-to-left",
+                "top-to-bottom", "bottom-to-top")
+_sections = {
+    "preprocessor": ("image_size", "optimize", "profile", "roi", "stages"),
+    "target": ("lower", "upper", "roi", "track", "margin", "fallback", "mode",
+               "sort_method"),
+}
+_stage_keys = ("func", "args", "kwargs", "in_place", "dst")
+# robovision functions a spec can name as stages, all image -> image
+stage_functions = {func.__name__: func for func in (
+    core.adjust_brightness, core.adjust_brightness_contrast, core.adjust_contrast,
+    core.adjust_gamma, core.detect_edges, core.equalize, core.flatten, core.resize,
+    core.resize_raw)}
+
+
+class Pipeline(object):
+    def __init__(self, preprocessor=None, target=None, mode=cv2.RETR_EXTERNAL,
+                 sort_method="none"):
+        """
+        :param preprocessor: Optional, Preprocessor frames go through first
+        :param target: Optional, Target that finds contours in the result
+        :param mode: Contour retrieval mode passed to get_contours
+        :param sort_method: Contour sort order passed to get_contours
+        """
+        self.preprocessor = preprocessor
+        self.target = target
+        self.mode = mode
+        self.sort_method = sort_method
+
+    def process(self, image):
+        """
+        Run an image through the pipeline
+
+        :param image: OpenCV BGR image
+        :return: Contours if the pipeline has a target, else the preprocessed image
+        """
+        if self.preprocessor is not None:
+            image = self.preprocessor.preprocess(image)
+        if self.target is None:
+            return image
+        return self.target.get_contours(image, mode=self.mode, sort_method=self.sort_method)
+
+    def warm_up(self, resolution, frames=3):
+        """
+        Push synthetic frames through the whole pipeline so OpenCV's one-time
+        setup is done before real frames arrive. Any state that depends on
+        the frames seen (profiles, tracked regions) is reset afterwards.
+
+        :param resolution: (width, height) of the frames to expect
+        :param frames: Number of synthetic frames
+        :return: The Pipeline, for chaining
+        """
+        for image in synthetic_frames(resolution, frames):
+            self.process(image)
+        if self.preprocessor is not None:
+            self.preprocessor.reset_profile()
+        if self.target is not None:
+            self.target.roi = self.target.static_roi
+        return self
+
+
+def load_pipeline(spec):
+    """
+    Build a Pipeline from a spec, see above
+
+    :param spec: Dictionary, or path of a .json, .yaml or .yml file
+    :return: Pipeline
+    :raises ValueError: if anything in the spec is invalid
+    """
+    if isinstance(spec, str):
+        spec = _read_spec(spec)
+    _check_keys(spec, _sections, "spec")
+    pipeline = Pipeline()
+    if spec.get("preprocessor") is not None:
+        pipeline.preprocessor = _build_preprocessor(spec["preprocessor"])
+    if spec.get("target") is not None:
+        target_spec = spec["target"]
+        pipeline.target = _build_target(target_spec)
+        pipeline.mode = _value(target_spec.get("mode", cv2.RETR_EXTERNAL))
+        pipeline.sort_method = target_spec.get("sort_method", "none")
+        if pipeline.sort_method not in sort_methods:
+            raise ValueError("target.sort_method must be one of {}".format(", ".join(sort_methods)))
+    return pipeline
+
+
+def synthetic_frames(resolution, frames=3, channels=3):
+    """
+    Random noise frames for warming up a pipeline. Noise exercises every
+    code path a real frame would (masks aren't empty, contours are found).
+
+    :param resolution: (width, height) of the frames
+    :param frames: Number of frames
+    :param channels: 3 for BGR or 1 for grayscale
+    :return: Generator of images
+    """
+    width, height = resolution
+    shape = (height, width, channels) if channels > 1 else (height, width)
+    random = np.random.RandomState(0)
+    for _ in range(frames):
+        yield random.randint(0, 256, size=shape, dtype=np.uint8)
+
+
+def _read_spec(path):
+    extension = os.path.splitext(path)[1].lower()
+    with open(path) as f:
+        if extension in (".yaml", ".yml"):
+            try:
+                import yaml
+            except ImportError:
+                raise ImportError("Loading YAML pipelines requires PyYAML (pip install pyyaml)")
+            return yaml.safe_load(f)
+        return json.load(f)
+
+
+def _build_preprocessor(spec):
+    _check_keys(spec, _sections["preprocessor"], "preprocessor")
+    preprocessor = Preprocessor(image_size=spec.get("image_size"),
+                                optimize=_flag(spec, "optimize", "preprocessor"),
+                                profile=_flag(spec, "profile", "preprocessor"))
+    if spec.get("roi") is not None:
+        preprocessor.set_roi(_roi(spec["roi"], "preprocessor.roi"))
+    stages = spec.get("stages", [])
+    if not isinstance(stages, list):
+        raise ValueError("preprocessor.stages must be a list")
+    for i, stage in enumerate(stages):
+        where = "preprocessor.stages[{}]".format(i)
+        _check_keys(stage, _stage_keys, where)
+        func = _function(stage.get("func"), where)
+        args = stage.get("args", [])
+        kwargs = stage.get("kwargs", {})
+        if not isinstance(args, list) or not isinstance(kwargs, dict):
+            raise ValueError("{}: args must be a list and kwargs a dictionary".format(where))
+        args = tuple(_value(arg) for arg in args)
+        kwargs = {key: _value(value) for key, value in kwargs.items()}
+        _check_arguments(func, args, kwargs, where)
+        preprocessor.add_processor(func, args=args, kwargs=kwargs,
+                                   in_place=_flag(stage, "in_place", where, default=None),
+                                   dst=_flag(stage, "dst", where))
+    return preprocessor
+
+
+def _build_target(spec):
+    _check_keys(spec, _sections["target"], "target")
+    target = Target()
+    target.set_color_range(lower=_color(spec.get("lower", (100, 100, 100)), "target.lower"),
+                           upper=_color(spec.get("upper", (255, 255, 255)), "target.upper"))
+    roi = spec.get("roi")
+    margin = spec.get("margin", 0.5)
+    if not isinstance(margin, (int, float)) or margin < 0:
+        raise ValueError("target.margin must be a number, 0 or more")
+    target.set_roi(roi=_roi(roi, "target.roi") if roi is not None else None,
+                   track=_flag(spec, "track", "target"), margin=margin,
+                   fallback=_flag(spec, "fallback", "target", True))
+    return target
+
+
+def _check_keys(spec, allowed, where):
+    if not isinstance(spec, dict):
+        raise ValueError("{} must be a dictionary".format(where))
+    unknown = sorted(set(spec) - set(allowed))
+    if unknown:
+        raise ValueError("{}: unknown key(s) {}; expected {}".format(
+            where, ", ".join(unknown), ", ".join(allowed)))
+
+
+def _flag(spec, key, where, default=False):
+    value = spec.get(key, default)
+    if value is not default and not isinstance(value, bool):
+        raise ValueError("{}.{} must be true or false".format(where, key))
+    return value
+
+
+def _function(name, where):
+    """
+    Look up a stage function by name: one of stage_functions or "cv2.name"
+    """
+    func = None
+    if isinstance(name, str):
+        if name.startswith("cv2."):
+            func = getattr(cv2, name[4:], None)
+        else:
+            func = stage_functions.get(name)
+    if not callable(func) or inspect.isclass(func):
+        raise ValueError("{}: unknown function {!r}".format(where, name))
+    return func
+
+
+def _value(value):
+    """
+    Convert a spec value to what OpenCV expects
+    """
+    if isinstance(value, str) and value.startswith("cv2."):
+        constant = getattr(cv2, value[4:], None)
+        if not isinstance(constant, int):
+            raise ValueError("unknown OpenCV constant {!r}".format(value))
+        return constant
+    if isinstance(value, list):
+        return tuple(_value(v) for v in value)
+    return value
+
+
+def _check_arguments(func, args, kwargs, where):
+    try:
+        signature = inspect.signature(func)
+    except (TypeError, ValueError):
+        # OpenCV's functions can't be introspected; they're checked by warm_up
+        return
+    try:
+        signature.bind(None, *args, **kwargs)
+    except TypeError as e:
+        raise ValueError("{}: {}".format(where, e))
+
+
+def _roi(value, where):
+    if not isinstance(value, list) or len(value) != 4 or \
+            not all(isinstance(v, int) for v in value) or value[2] <= 0 or value[3] <= 0:
+        raise ValueError("{} must be [x, y, width, height] with a positive size".format(where))
+    return tuple(value)
+
+
+def _color(value, where):
+    value = list(value) if isinstance(value, (list, tuple)) else []
+    if len(value) != 3 or not all(isinstance(v, (int, float)) and 0 <= v <= 255 for v in value):
+        raise ValueError("{} must be three numbers from 0 to 255".format(where))
+    return tuple(value)
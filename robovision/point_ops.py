@@ -0,0 +1,139 @@
+"""
+Point operations with lookup tables
+
+A point operation changes each pixel based only on its own value:
+brightness, contrast, gamma, tone curves. For 8-bit images there are only
+256 possible inputs, so rather than doing the math on every pixel the
+results for all 256 values are worked out once into a lookup table (LUT)
+and applied with a single cv2.LUT pass. Tables are cached by their
+parameters, and several can be composed into one so a chain of
+adjustments still costs one pass.
+
+lut = rv.point_ops.compose(rv.point_ops.gamma_lut(1.5),
+                           rv.point_ops.brightness_contrast_lut(10, 20))
+image = rv.point_ops.apply_lut(image, lut)
+
+A per-channel table (shape (256, channels)) maps each channel
+separately; see per_channel(). Tables are read-only, since they're shared.
+
+Author: Tim Poulsen
+Web site: https://timpoulsen.com
+Copyright 2018, Tim Poulsen, all rights reserved
+License: MIT
+"""
+import cv2
+import numpy as np
+from functools import lru_cache
+
+_levels = np.arange(256)
+
+
+@lru_cache(maxsize=256)
+def brightness_contrast_lut(brightness=0., contrast=0.):
+    """
+    Table for adjust_brightness_contrast(). The arithmetic mirrors
+    cv2.addWeighted (float32 weights, round half to even) so the results
+    are identical to blending the image with itself.
+
+    :param brightness: Float, brightness adjustment with 0 meaning no change
+    :param contrast: Float, contrast adjustment with 0 meaning no change
+    :return: Lookup table
+    """
+    alpha = np.float32(1 + float(contrast) / 100.)
+    beta = np.float32(float(brightness))
+    values = (_levels * alpha + beta).astype(np.float32)
+    return _table(np.rint(values))
+
+
+@lru_cache(maxsize=256)
+def gamma_lut(gamma=1.):
+    """
+    Table for gamma correction; values above 1 brighten the mid-tones and
+    values below 1 darken them
+
+    :param gamma: Positive float, 1 meaning no change
+    :return: Lookup table
+    """
+    if gamma <= 0:
+        raise ValueError("gamma must be positive")
+    return _table(np.rint(255. * (_levels / 255.) ** (1. / gamma)))
+
+
+def curve_lut(points):
+    """
+    Table for a tone curve through the given control points, with straight
+    lines between them (like the curves tool of a photo editor)
+
+    :param points: Sequence of (input, output) pairs from 0 to 255, e.g.
+                   ((0, 0), (64, 32), (255, 255)) to darken the shadows
+    :return: Lookup table
+    """
+    return _curve_lut(tuple((float(x), float(y)) for x, y in points))
+
+
+@lru_cache(maxsize=256)
+def _curve_lut(points):
+    points = sorted(points)
+    if len(points) < 2:
+        raise ValueError("A curve needs at least two points")
+    xs, ys = zip(*points)
+    return _table(np.rint(np.interp(_levels, xs, ys)))
+
+
+def per_channel(*luts):
+    """
+    Combine one table per channel into a table that maps each channel of
+    an image separately, e.g. per_channel(blue_lut, green_lut, red_lut)
+
+    :return: Lookup table of shape (256, channels)
+    """
+    return _readonly(np.stack([np.asarray(lut).reshape(256) for lut in luts], axis=1))
+
+
+def compose(*luts):
+    """
+    Combine tables into one that has the effect of applying them in order
+
+    :return: Lookup table, per channel if any of the tables are
+    """
+    result = _levels
+    for lut in luts:
+        lut = np.asarray(lut)
+        if result.ndim == 1 and lut.ndim == 1:
+            result = lut[result]
+        else:
+            # look up each channel of `result` in the matching column of `lut`
+            channels = max(_channels(result), _channels(lut))
+            result = np.broadcast_to(result.reshape(256, -1), (256, channels))
+            lut = np.broadcast_to(lut.reshape(256, -1), (256, channels))
+            result = np.take_along_axis(lut, result.astype(np.intp), axis=0)
+    return _readonly(np.ascontiguousarray(result, dtype=np.uint8))
+
+
+def apply_lut(image, lut, dst=None):
+    """
+    Map every pixel of an 8-bit image through a table in one pass
+
+    :param image: 8-bit image
+    :param lut: Lookup table, single or per channel
+    :param dst: Optional, image of the same size and type to write into
+    :return: Mapped image
+    """
+    lut = np.asarray(lut)
+    if lut.ndim > 1:
+        # OpenCV reads a (256, 1, channels) array as a multi-channel table
+        lut = lut.reshape(256, 1, -1)
+    return cv2.LUT(image, lut, dst=dst)
+
+
+def _channels(lut):
+    return lut.shape[1] if lut.ndim > 1 else 1
+
+
+def _table(values):
+    return _readonly(np.clip(values, 0, 255).astype(np.uint8))
+
+
+def _readonly(lut):
+    lut.setflags(write=False)
+    return lut
@@ -1,20 +1,113 @@
 """
 Preprocessor helper
 
+The stages are compiled into a plan of pre-bound callables the first time
+an image is processed (or when compile() is called), so processing a frame
+costs little more than the stage functions themselves.
+
+With optimize=True, the plan is also rewritten to do less work per frame:
+
+- resizes move ahead of the per-pixel stages before them (brightness,
+  contrast and color conversions), so those run on fewer pixels
+- a color conversion immediately undone by the next stage (e.g. BGR->HSV
+  then HSV->BGR) is dropped
+- consecutive point operations (brightness, contrast, gamma, and
+  point_ops.apply_lut with a table) become a single 256-entry lookup
+  table applied in one pass
+
+The lookup table gives the same result as the separate adjustments.
+Moving a resize or dropping a round trip can change pixel values slightly,
+which is why optimizing is opt-in. Use explain() to see what will run.
+
+With profile=True, the wall time of every step is recorded so report()
+can show which one is blowing the frame budget. Profiling costs nothing
+when it's off.
+
+pipeline() runs the plan over a sequence of frames with the steps spread
+across worker threads connected by bounded queues, so one frame can be
+resized while the previous one is being thresholded. Most OpenCV functions
+release the GIL, so throughput approaches the rate of the slowest step
+rather than the sum of all of them.
+
+preprocess_batch() is for offline work over recorded frames: images (or
+image files) are sent in chunks to a pool of worker processes, each with
+its own copy of the Preprocessor, so every core is busy. Stage functions
+and their arguments must be picklable for this, e.g. module-level
+functions rather than lambdas.
+
+set_roi() limits processing to a region of interest, cropped (without
+copying) before any stage runs. The region can be fixed or a function
+called for every frame, e.g. to follow a Target's last detection:
+
+pp.set_roi(lambda: target.roi)
+
 Author: Tim Poulsen
 Web site: https://timpoulsen.com
 Copyright 2018, Tim Poulsen, all rights reserved
 License: MIT
 """
 import cv2
+import inspect
 import logging
+import numpy as np
+import os
+import queue
+import threading
+import time
+from collections import deque, namedtuple
+from concurrent.futures import ProcessPoolExecutor
+from . import point_ops
+from .core import adjust_brightness, adjust_brightness_contrast, adjust_contrast
+from .core import adjust_gamma, resize, resize_raw
+from .deck import Deck
+from .image_files import list_images
+from .roi import clip_roi
+
+Stage = namedtuple("Stage", "func args kwargs in_place dst")
+
+# lookup tables equivalent to point operation stages, from their arguments
+_point_funcs = {
+    adjust_brightness: lambda a: point_ops.brightness_contrast_lut(a["brightness"], 0.),
+    adjust_contrast: lambda a: point_ops.brightness_contrast_lut(0., a["contrast"]),
+    adjust_brightness_contrast: lambda a: point_ops.brightness_contrast_lut(a["brightness"],
+                                                                            a["contrast"]),
+    adjust_gamma: lambda a: point_ops.gamma_lut(a["gamma"]),
+    point_ops.apply_lut: lambda a: a["lut"] if a["dst"] is None else None,
+}
+_resize_funcs = resize, resize_raw, cv2.resize
+# color conversion codes and the codes that undo them
+_round_trips = {}
+for _there, _back in (("BGR2HSV", "HSV2BGR"), ("BGR2HSV_FULL", "HSV2BGR_FULL"),
+                      ("BGR2HLS", "HLS2BGR"), ("BGR2LAB", "LAB2BGR"), ("BGR2LUV", "LUV2BGR"),
+                      ("BGR2YCrCb", "YCrCb2BGR"), ("BGR2YUV", "YUV2BGR"), ("BGR2RGB", "RGB2BGR"),
+                      ("RGB2HSV", "HSV2RGB"), ("RGB2LAB", "LAB2RGB")):
+    _there, _back = getattr(cv2, "COLOR_" + _there), getattr(cv2, "COLOR_" + _back)
+    _round_trips[_there] = _back
+    _round_trips[_back] = _there
 
 
 class Preprocessor():
-    def __init__(self, image_size=None, log_level=logging.DEBUG):
+    def __init__(self, image_size=None, log_level=logging.DEBUG, optimize=False,
+                 profile=False, profile_window=1000):
+        """
+        :param image_size: Optional, size of the square image to resize to first
+        :param log_level: Logging level
+        :param optimize: Rewrite the plan to do less work, see above
+        :param profile: Record how long each step takes, see report()
+        :param profile_window: Number of most recent frames the profile
+                               percentiles are calculated over
+        """
         logging.basicConfig(level=log_level, format='%(levelname)s - %(message)s')
-        self.image_size = self.set_image_size(image_size)
         self.processors = []
+        self.optimize = optimize
+        self.profile = profile
+        self.profile_window = profile_window
+        self.set_image_size(image_size)
+        self._plan = None
+        self._steps = None
+        self._copy_input = True
+        self._timings = None
+        self.set_roi()
 
     def preprocess(self, image):
         """
@@ -22,28 +115,205 @@ class Preprocessor():
         passing any arguments or named arguments if supplied. If an image_size
         is set, resizing will be the first operation performed on the image.
 
+        With a region of interest set, only that part of the image is
+        processed; `last_roi` holds the (x, y, width, height) that was used,
+        or None if it was the whole image, for translating results back.
+
+        The input image is never modified. It's copied first unless every
+        stage is known not to modify its input (see add_processor's
+        `in_place`); without the copy, the result may be the input itself
+        if every stage returns its input unchanged.
+
         :param image: Image to process
         :return: Processed image
         """
-        img = image.copy()
+        if self._plan is None:
+            self.compile()
+        if self.roi is not None:
+            image = self._crop(image)
+        if self.profile:
+            return self._preprocess_profiled(image)
+        img = image.copy() if self._copy_input else image
+        for stage in self._plan:
+            img = stage(img)
+        return img
+
+    def compile(self):
+        """
+        Freeze the stages into a plan of callables with their arguments
+        already bound, optimizing it if `optimize` is set. Called automatically
+        when stages change; call it yourself if you edit `processors` directly.
+
+        :return: The Preprocessor, for chaining
+        """
+        steps = []
         if self.image_size is not None:
             dim = (self.image_size, self.image_size)
-            img = cv2.resize(img, dim, interpolation=cv2.INTER_AREA)
-        for processor in self.processors:
-            func, args, kwargs = processor
-            if callable(func):
-                # TODO: optimize this
-                if args is not None and kwargs is not None:
-                    img = func(img, *args, **kwargs)
-                elif args is None and kwargs is not None:
-                    img = func(img, **kwargs)
-                elif args is not None and kwargs is None:
-                    img = func(img, *args)
-                else:
-                    img = func(img)
-        return img
+            steps.append(_PlanStep("resize", cv2.resize, (dim,),
+                                   {"interpolation": cv2.INTER_AREA}))
+        for stage in self.processors:
+            steps.append(_PlanStep.from_stage(stage))
+        if self.optimize:
+            steps = _fuse_point_steps(_drop_round_trips(_hoist_resizes(steps)))
+        self._copy_input = any(step.in_place for step in steps)
+        self._steps = steps
+        self._plan = [step.bind() for step in steps]
+        self.reset_profile()
+        return self
+
+    def explain(self):
+        """
+        Describe the compiled plan, one line per step, in the order the
+        steps run on each frame
+
+        :return: String
+        """
+        if self._plan is None:
+            self.compile()
+        lines = []
+        if self._copy_input:
+            lines.append("copy input")
+        lines.extend(step.describe() for step in self._steps)
+        return "\n".join("{}. {}".format(i + 1, line) for i, line in enumerate(lines))
 
-    def add_processor(self, func, args=None, kwargs=None):
+    def pipeline(self, images, threads=None, queue_size=2):
+        """
+        Process a sequence of images with the steps of the plan running
+        concurrently on worker threads, yielding the results in order. For
+        example, with a VideoStream that has no preprocessor attached:
+
+            for frame in pp.pipeline(vs.frames()):
+                ...
+
+        Steps that reuse a `dst` buffer get a new one per frame here, since a
+        buffer can't be refilled while the next thread is still reading it.
+        Steps aren't profiled in this mode.
+
+        :param images: Iterable of images
+        :param threads: Optional, number of worker threads; consecutive steps
+                        are grouped evenly onto them. Defaults to one per step.
+        :param queue_size: Images each queue between threads can hold
+        :return: Generator of processed images
+        """
+        if self._plan is None:
+            self.compile()
+        stages = [step.bind(reuse_dst=False) for step in self._steps]
+        if len(stages) == 0:
+            stages = [lambda image: image]
+        threads = len(stages) if threads is None else max(1, min(int(threads), len(stages)))
+        groups = [stages[group[0]:group[-1] + 1]
+                  for group in np.array_split(np.arange(len(stages)), threads)]
+        queues = [queue.Queue(maxsize=queue_size) for _ in range(len(groups) + 1)]
+        stop = threading.Event()
+        workers = [threading.Thread(target=self._feed_pipeline, args=(images, queues[0], stop),
+                                    name="Preprocessor", daemon=True)]
+        for group, inbox, outbox in zip(groups, queues, queues[1:]):
+            workers.append(threading.Thread(target=_run_pipeline_group,
+                                            args=(group, inbox, outbox, stop),
+                                            name="Preprocessor", daemon=True))
+        for worker in workers:
+            worker.start()
+        try:
+            while True:
+                item = _get(queues[-1], stop)
+                if item is _end_of_pipeline:
+                    return
+                if isinstance(item, _PipelineError):
+                    raise item.error
+                yield item
+        finally:
+            # also reached when the consumer stops early; unblock the workers
+            stop.set()
+
+    def preprocess_batch(self, images, workers=None, chunksize=16, output_dir=None):
+        """
+        Process many images using a pool of worker processes, yielding the
+        results in the same order as the input. Only a few chunks per worker
+        are in flight at a time, so arbitrarily long inputs use bounded memory.
+
+        :param images: Iterable of images and/or image file paths, or the path
+                       of a directory of images (processed in filename order)
+        :param workers: Optional, number of worker processes; defaults to the
+                        number of CPUs. 0 processes everything in this process.
+        :param chunksize: Number of images sent to a worker at a time
+        :param output_dir: Optional, directory to write the results to, using
+                           the input's filename or else a numbered PNG name
+        :return: Generator of processed images, or of the paths written when
+                 output_dir is given
+        """
+        if isinstance(images, str):
+            images = list_images(images)
+        if output_dir is not None:
+            os.makedirs(output_dir, exist_ok=True)
+        chunks = _chunks(images, chunksize)
+        if workers == 0:
+            for chunk in chunks:
+                yield from _process_batch(self, chunk, output_dir)
+            return
+        workers = workers or os.cpu_count() or 1
+        with ProcessPoolExecutor(workers, initializer=_init_batch_worker,
+                                 initargs=(self,)) as pool:
+            pending = deque()
+            for chunk in chunks:
+                pending.append(pool.submit(_process_batch, None, chunk, output_dir))
+                if len(pending) >= workers * 2:
+                    yield from pending.popleft().result()
+            while len(pending) > 0:
+                yield from pending.popleft().result()
+
+    def profile_stats(self):
+        """
+        Timings recorded while `profile` was on, for each step of the plan
+        and for the whole frame (named "total"). Times are in seconds;
+        `count` is the total number of frames, the rest cover the last
+        `profile_window` frames.
+
+        :return: List of dictionaries with name, count, mean, p50, p95, p99
+                 and max, with None for anything not yet measured
+        """
+        if self._plan is None:
+            self.compile()
+        names = [step.describe() for step in self._steps] + ["total"]
+        if self._copy_input:
+            names.insert(0, "copy input")
+        stats = []
+        for name, (count, times) in zip(names, self._timings):
+            row = {"name": name, "count": count, "mean": None,
+                   "p50": None, "p95": None, "p99": None, "max": None}
+            if len(times) > 0:
+                row["mean"] = float(np.mean(times))
+                row["p50"], row["p95"], row["p99"] = \
+                    np.percentile(times, (50, 95, 99)).tolist()
+                row["max"] = max(times)
+            stats.append(row)
+        return stats
+
+    def report(self, file=None):
+        """
+        Format the profile as a table, in milliseconds
+
+        :param file: Optional, file-like object to print the table to
+        :return: The table as a string
+        """
+        lines = ["{:>8} {:>8} {:>8} {:>8} {:>8} {:>8}  {}".format(
+            "count", "mean", "p50", "p95", "p99", "max", "step")]
+        for row in self.profile_stats():
+            times = ["{:8.3f}".format(row[k] * 1000) if row[k] is not None else "{:>8}".format("-")
+                     for k in ("mean", "p50", "p95", "p99", "max")]
+            lines.append("{:8d} {}  {}".format(row["count"], " ".join(times), row["name"]))
+        table = "\n".join(lines)
+        if file is not None:
+            print(table, file=file)
+        return table
+
+    def reset_profile(self):
+        """
+        Discard the timings recorded so far
+        """
+        steps = len(self._plan) + (2 if self._copy_input else 1) if self._plan is not None else 0
+        self._timings = [[0, Deck(maxlen=self.profile_window)] for _ in range(steps)]
+
+    def add_processor(self, func, args=None, kwargs=None, in_place=None, dst=False):
         """
         Add a processor function to the stack, optionally passing
         arguments that will be passed to the function when it's called
@@ -51,9 +321,19 @@ class Preprocessor():
         :param func: A reference to the function to call. Must be `callable`
         :param args: Optional, tuple of unnamed arguments to pass in order to the function.
         :param kwargs: Optional, dictionary of named arguments to pass to the function
+        :param in_place: True if the function modifies the image it's given,
+                         False if it never does. The input is copied before
+                         processing unless every stage is False. Left as None,
+                         robovision's resize and adjust functions, cv2.resize
+                         and cv2.cvtColor count as False and anything else as True.
+        :param dst: Set to True if the function accepts an OpenCV-style `dst`
+                    argument; its previous output is then passed back in to be
+                    reused. That output is overwritten by the next call, so copy
+                    the result if you keep it across frames.
         """
         if callable(func):
-            self.processors.append((func, args, kwargs))
+            self.processors.append(Stage(func, args, kwargs, in_place, dst))
+            self._plan = None
 
     def set_image_size(self, image_size):
         """
@@ -63,3 +343,302 @@ class Preprocessor():
             self.image_size = int(image_size)
         except (TypeError, ValueError):
             self.image_size = None
+        self._plan = None
+
+    def set_roi(self, roi=None):
+        """
+        Process only a region of interest
+
+        :param roi: Optional, (x, y, width, height) region, or a function
+                    returning one (or None for the whole image) that's called
+                    for every image; None to process whole images
+        """
+        self.roi = roi
+        self.last_roi = None
+
+    def __getstate__(self):
+        # compiled plans hold closures, which can't be pickled; a copy
+        # compiles its own
+        state = self.__dict__.copy()
+        state.update(_plan=None, _steps=None, _timings=None)
+        return state
+
+    def _feed_pipeline(self, images, inbox, stop):
+        try:
+            for image in images:
+                if stop.is_set():
+                    return
+                if self.roi is not None:
+                    image = self._crop(image)
+                _put(inbox, image.copy() if self._copy_input else image, stop)
+        except Exception as e:
+            _put(inbox, _PipelineError(e), stop)
+            return
+        _put(inbox, _end_of_pipeline, stop)
+
+    def _crop(self, image):
+        roi = self.roi() if callable(self.roi) else self.roi
+        self.last_roi = clip_roi(roi, image.shape)
+        if self.last_roi is None:
+            return image
+        x, y, w, h = self.last_roi
+        return image[y:y + h, x:x + w]
+
+    def _preprocess_profiled(self, image):
+        timings = iter(self._timings)
+        clock = time.perf_counter
+        started = last = clock()
+        img = image
+        if self._copy_input:
+            img = image.copy()
+            last = _record(next(timings), started, clock())
+        for stage in self._plan:
+            img = stage(img)
+            last = _record(next(timings), last, clock())
+        _record(next(timings), started, last)
+        return img
+
+
+_batch_preprocessor = None
+
+
+def _init_batch_worker(preprocessor):
+    global _batch_preprocessor
+    _batch_preprocessor = preprocessor
+
+
+def _chunks(images, chunksize):
+    """
+    Split an iterable into lists of (output filename, image or path)
+    """
+    chunk = []
+    for i, image in enumerate(images):
+        if isinstance(image, str):
+            name = os.path.basename(image)
+        else:
+            name = "{:06d}.png".format(i)
+        chunk.append((name, image))
+        if len(chunk) >= chunksize:
+            yield chunk
+            chunk = []
+    if len(chunk) > 0:
+        yield chunk
+
+
+def _process_batch(preprocessor, chunk, output_dir):
+    preprocessor = preprocessor or _batch_preprocessor
+    results = []
+    for name, image in chunk:
+        if isinstance(image, str):
+            path = image
+            image = cv2.imread(path)
+            if image is None:
+                raise IOError("Unable to read {}".format(path))
+        result = preprocessor.preprocess(image)
+        if output_dir is not None:
+            path = os.path.join(output_dir, name)
+            cv2.imwrite(path, result)
+            result = path
+        results.append(result)
+    return results
+
+
+_end_of_pipeline = object()
+
+
+class _PipelineError(object):
+    """
+    An exception raised by a pipeline worker, passed along to the consumer
+    """
+    def __init__(self, error):
+        self.error = error
+
+
+def _run_pipeline_group(stages, inbox, outbox, stop):
+    while not stop.is_set():
+        item = _get(inbox, stop)
+        if item is not _end_of_pipeline and not isinstance(item, _PipelineError):
+            try:
+                for stage in stages:
+                    item = stage(item)
+            except Exception as e:
+                item = _PipelineError(e)
+        _put(outbox, item, stop)
+        if item is _end_of_pipeline:
+            return
+
+
+def _get(inbox, stop):
+    while not stop.is_set():
+        try:
+            return inbox.get(timeout=0.1)
+        except queue.Empty:
+            pass
+    return _end_of_pipeline
+
+
+def _put(outbox, item, stop):
+    while not stop.is_set():
+        try:
+            outbox.put(item, timeout=0.1)
+            return
+        except queue.Full:
+            pass
+
+
+def _record(timing, started, finished):
+    timing[0] += 1
+    timing[1].push(finished - started)
+    return finished
+
+
+class _PlanStep(object):
+    """
+    One step of a compiled plan. `kind` is "resize", "point" (an operation
+    with a lookup table), "color" (cvtColor) or "stage" (anything else).
+    """
+    def __init__(self, kind, func, args=None, kwargs=None, in_place=False, dst=False,
+                 lut=None, fused=None):
+        self.kind = kind
+        self.func = func
+        self.args = tuple(args or ())
+        self.kwargs = dict(kwargs or {})
+        self.in_place = in_place
+        self.dst = dst
+        self.lut = lut
+        # the original point steps a lookup table replaces
+        self.fused = fused or [self]
+
+    @classmethod
+    def from_stage(cls, stage):
+        func, args, kwargs = stage.func, stage.args, stage.kwargs
+        kind = "stage"
+        lut = None
+        if func in _resize_funcs:
+            kind = "resize"
+        elif func in _point_funcs and not stage.dst:
+            values = inspect.signature(func).bind(None, *(args or ()), **(kwargs or {}))
+            values.apply_defaults()
+            lut = _point_funcs[func](values.arguments)
+            if lut is not None:
+                kind = "point"
+        elif func is cv2.cvtColor and _color_code(args, kwargs) is not None:
+            kind = "color"
+        in_place = stage.in_place
+        if in_place is None:
+            # only the functions recognized above are known to leave their input alone
+            in_place = kind == "stage"
+        return cls(kind, func, args, kwargs, in_place, stage.dst, lut=lut)
+
+    def bind(self, reuse_dst=True):
+        if self.kind == "point" and len(self.fused) > 1:
+            return _bind_lut(self.lut, [step.bind() for step in self.fused])
+        return _bind(self.func, self.args, self.kwargs, self.dst and reuse_dst)
+
+    def describe(self):
+        if self.kind == "point" and len(self.fused) > 1:
+            return "lookup table: " + " + ".join(step.describe() for step in self.fused)
+        arguments = [_describe_value(arg) for arg in self.args]
+        arguments.extend("{}={}".format(k, _describe_value(v)) for k, v in self.kwargs.items())
+        return "{}({})".format(getattr(self.func, "__name__", repr(self.func)),
+                               ", ".join(arguments))
+
+
+def _describe_value(value):
+    if isinstance(value, np.ndarray):
+        # arrays (lookup tables, kernels) would fill the screen
+        return "<{} array {}>".format(value.dtype, "x".join(str(n) for n in value.shape))
+    return repr(value)
+
+
+def _hoist_resizes(steps):
+    """
+    Move each resize ahead of the per-pixel steps that precede it
+    """
+    steps = list(steps)
+    for i in range(len(steps)):
+        if steps[i].kind != "resize":
+            continue
+        j = i
+        while j > 0 and steps[j - 1].kind in ("point", "color"):
+            steps[j - 1], steps[j] = steps[j], steps[j - 1]
+            j -= 1
+    return steps
+
+
+def _drop_round_trips(steps):
+    """
+    Remove pairs of adjacent color conversions that cancel each other out
+    """
+    result = []
+    for step in steps:
+        if step.kind == "color" and len(result) > 0 and result[-1].kind == "color" and \
+                _round_trips.get(_color_code(result[-1].args, result[-1].kwargs)) == \
+                _color_code(step.args, step.kwargs):
+            result.pop()
+            continue
+        result.append(step)
+    return result
+
+
+def _fuse_point_steps(steps):
+    """
+    Combine runs of point operation steps into one lookup table
+    """
+    result = []
+    for step in steps:
+        if step.kind == "point" and len(result) > 0 and result[-1].kind == "point":
+            previous = result.pop()
+            step = _PlanStep("point", point_ops.apply_lut,
+                             lut=point_ops.compose(previous.lut, step.lut),
+                             fused=previous.fused + step.fused)
+        result.append(step)
+    return result
+
+
+def _color_code(args, kwargs):
+    """
+    The conversion code of a plain cvtColor(image, code) stage, else None
+    """
+    args, kwargs = tuple(args or ()), dict(kwargs or {})
+    if len(args) == 1 and len(kwargs) == 0:
+        return args[0]
+    if len(args) == 0 and list(kwargs) == ["code"]:
+        return kwargs["code"]
+    return None
+
+
+def _bind_lut(lut, fallback):
+    """
+    Apply a fused lookup table to 8-bit images; other image types run the
+    original steps one after another
+    """
+    def stage(image):
+        if image.dtype == np.uint8:
+            return point_ops.apply_lut(image, lut)
+        for step in fallback:
+            image = step(image)
+        return image
+    return stage
+
+
+def _bind(func, args=None, kwargs=None, dst=False):
+    """
+    Wrap a stage function so it can be called with just the image
+    """
+    args = tuple(args or ())
+    kwargs = dict(kwargs or {})
+    if dst:
+        buffer = [None]
+
+        def stage(image):
+            buffer[0] = func(image, *args, dst=buffer[0], **kwargs)
+            return buffer[0]
+        return stage
+    if args and kwargs:
+        return lambda image: func(image, *args, **kwargs)
+    if args:
+        return lambda image: func(image, *args)
+    if kwargs:
+        return lambda image: func(image, **kwargs)
+    return func
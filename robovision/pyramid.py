@@ -0,0 +1,117 @@
+"""
+Multi-resolution image cache
+
+Preview windows, the driver stream and detectors often each want their own
+size of the same frame. A Pyramid makes each size once, and makes it from
+the smallest version already made that's still big enough, rather than
+from full resolution every time.
+
+pyramid = rv.Pyramid(frame)
+preview = pyramid.resize(width=320)
+search = pyramid.resize(width=160)  # made from the 320 wide version
+coarse = pyramid.level(3)           # 1/8 size, for a quick first search
+
+Frame objects have one built in (frame.pyramid), which Frame.resized()
+uses, so everything working on the same Frame shares it.
+Sizes made from an intermediate size can differ by a level or so from
+resizing the full image directly. Returned images are shared; don't
+modify them.
+
+Author: Tim Poulsen
+Web site: https://timpoulsen.com
+Copyright 2018, Tim Poulsen, all rights reserved
+License: MIT
+"""
+import cv2
+import threading
+
+
+class Pyramid(object):
+    def __init__(self, image, interpolation=cv2.INTER_AREA):
+        """
+        :param image: Full resolution image
+        :param interpolation: OpenCV interpolation flag used by resize()
+        """
+        self.image = image
+        self.interpolation = interpolation
+        self._sizes = {}
+        self._levels = [image]
+        self._lock = threading.Lock()
+
+    def resize(self, width=None, height=None):
+        """
+        The image resized maintaining its aspect ratio, as robovision.resize()
+        would; specify either width or height (width takes precedence)
+
+        :param width: Integer new width of the image
+        :param height: Integer new height of the image
+        :return: Resized image
+        """
+        if width is None and height is None:
+            return self.image
+        h, w = self.image.shape[:2]
+        if width is None:
+            size = (int(w * height / float(h)), height)
+        else:
+            size = (width, int(h * width / float(w)))
+        return self.resize_raw(size)
+
+    def resize_raw(self, size):
+        """
+        The image resized to exactly (width, height)
+
+        :param size: (width, height)
+        :return: Resized image
+        """
+        size = (int(size[0]), int(size[1]))
+        resized = self._sizes.get(size)
+        if resized is None:
+            with self._lock:
+                resized = self._sizes.get(size)
+                if resized is None:
+                    source = self._source(size)
+                    if source.shape[1::-1] == size:
+                        resized = source
+                    else:
+                        resized = cv2.resize(source, size, interpolation=self.interpolation)
+                    self._sizes[size] = resized
+        return resized
+
+    def level(self, n):
+        """
+        Gaussian pyramid level: 0 is the image, each level above is half the
+        size of the one below (cv2.pyrDown), smoothed for coarse searching
+
+        :param n: Integer level
+        :return: Image
+        """
+        if n >= len(self._levels):
+            with self._lock:
+                while n >= len(self._levels):
+                    self._levels.append(cv2.pyrDown(self._levels[-1]))
+        return self._levels[n]
+
+    def levels(self, min_width=40):
+        """
+        Every level down to `min_width` pixels wide, smallest first, for
+        coarse-to-fine searches
+
+        :param min_width: Integer, smallest width to include
+        :return: List of (level number, image)
+        """
+        result = [(0, self.image)]
+        n = 1
+        while self.image.shape[1] >> n >= min_width:
+            result.append((n, self.level(n)))
+            n += 1
+        return result[::-1]
+
+    def _source(self, size):
+        """
+        The smallest image made so far that's at least `size` in both directions
+        """
+        source = self.image
+        for (w, h), image in self._sizes.items():
+            if size[0] <= w < source.shape[1] and size[1] <= h < source.shape[0]:
+                source = image
+        return source
@@ -0,0 +1,29 @@
+"""
+Region of interest helpers, shared by Target and Preprocessor
+
+A region is an (x, y, width, height) tuple in image coordinates.
+
+Author: Tim Poulsen
+Web site: https://timpoulsen.com
+Copyright 2018, Tim Poulsen, all rights reserved
+License: MIT
+"""
+
+
+def clip_roi(roi, shape):
+    """
+    Limit a region to an image
+
+    :param roi: (x, y, width, height) region, or None
+    :param shape: Shape of the image, as from image.shape
+    :return: The region within the image, or None if there's no region or
+             it's empty
+    """
+    if roi is None:
+        return None
+    x, y, w, h = roi
+    x0, y0 = max(x, 0), max(y, 0)
+    x1, y1 = min(x + w, shape[1]), min(y + h, shape[0])
+    if x1 <= x0 or y1 <= y0:
+        return None
+    return x0, y0, x1 - x0, y1 - y0
@@ -0,0 +1,164 @@
+"""
+Shared-memory frame ring for passing frames between processes without
+pickling or copying them through a multiprocessing.Queue.
+
+The grabbing process writes each frame into a slot of a block of shared
+memory and sends only the (slot, seq) pair to workers, e.g. over a Queue.
+Workers attach to the same block and get a zero-copy view of the slot.
+Each slot's header records the sequence number of the frame it holds, so
+a worker can tell whether the grabber has since reused the slot.
+
+Examples:
+
+import robovision as rv
+
+ring = rv.SharedFrameRing(shape=(240, 320, 3), slots=4)
+# in the grabber process
+slot, buffer = ring.next_slot()
+success, frame = cam.read(buffer)       # capture straight into shared memory
+seq = ring.commit(slot)
+queue.put((slot, seq))
+# in a worker process (the ring can be passed to the Process constructor)
+slot, seq = queue.get()
+frame = ring.get(slot, seq)
+if frame is not None:
+    # do stuff with the frame
+    if not ring.is_valid(slot, seq):
+        pass  # grabber overwrote it mid-processing, discard the result
+# when finished, in the process that created it
+ring.close()
+ring.unlink()
+
+Requires Python 3.8+ (multiprocessing.shared_memory)
+"""
+import numpy as np
+
+try:
+    from multiprocessing import shared_memory
+except ImportError:
+    shared_memory = None
+
+# keep frame data cache-line aligned after the header
+_HEADER_ALIGN = 64
+
+
+class SharedFrameRing(object):
+    def __init__(self, shape, dtype=np.uint8, slots=4, name=None, create=True):
+        """
+        Create (or attach to) a ring of `slots` frames of the given shape
+
+        :param shape: Tuple, shape of each frame, e.g. (height, width, 3)
+        :param dtype: Numpy dtype of the frames
+        :param slots: Number of frames the ring holds
+        :param name: Optional, shared memory block name; generated if creating
+        :param create: True to allocate the block, False to attach to `name`
+        """
+        if shared_memory is None:
+            raise ImportError("SharedFrameRing requires Python 3.8 or newer")
+        self.shape = tuple(shape)
+        self.dtype = np.dtype(dtype)
+        self.slots = int(slots)
+        self.created = create
+        header_size = -(-self.slots * 8 // _HEADER_ALIGN) * _HEADER_ALIGN
+        frame_size = int(np.prod(self.shape)) * self.dtype.itemsize
+        if create:
+            self.shm = shared_memory.SharedMemory(name=name, create=True,
+                                                  size=header_size + frame_size * self.slots)
+        else:
+            self.shm = _attach(name)
+        self.name = self.shm.name
+        self._seqs = np.ndarray((self.slots,), dtype=np.int64, buffer=self.shm.buf)
+        self._frames = np.ndarray((self.slots,) + self.shape, dtype=self.dtype,
+                                  buffer=self.shm.buf, offset=header_size)
+        if create:
+            self._seqs[:] = 0
+        self._seq = 0
+
+    @classmethod
+    def attach(cls, name, shape, dtype=np.uint8, slots=4):
+        """
+        Attach to a ring created by another process
+        """
+        return cls(shape, dtype=dtype, slots=slots, name=name, create=False)
+
+    def next_slot(self):
+        """
+        Claim the next slot for writing. Its header is cleared so readers
+        won't mistake a half-written frame for a complete one.
+
+        :return: Tuple of slot index and a writable view of the slot
+        """
+        slot = self._seq % self.slots
+        self._seqs[slot] = 0
+        return slot, self._frames[slot]
+
+    def commit(self, slot):
+        """
+        Mark the frame written into `slot` as complete
+
+        :return: Integer sequence number of the frame, starting at 1
+        """
+        self._seq += 1
+        self._seqs[slot] = self._seq
+        return self._seq
+
+    def write(self, frame):
+        """
+        Copy a frame into the next slot. Prefer next_slot()/commit() when the
+        frame can be captured directly into the slot.
+
+        :return: Tuple of slot index and sequence number
+        """
+        if frame.shape != self.shape:
+            raise ValueError("Frame shape {} doesn't match ring shape {}".format(
+                frame.shape, self.shape))
+        slot, buffer = self.next_slot()
+        np.copyto(buffer, frame)
+        return slot, self.commit(slot)
+
+    def get(self, slot, seq):
+        """
+        Zero-copy view of the frame in `slot`, if it still holds frame `seq`
+
+        :return: Read-only numpy view, or None if the slot has been reused
+        """
+        if not self.is_valid(slot, seq):
+            return None
+        frame = self._frames[slot]
+        frame.flags.writeable = False
+        return frame
+
+    def is_valid(self, slot, seq):
+        """
+        True if `slot` still holds frame `seq`. Check this after processing
+        a view to detect that the grabber overwrote it in the meantime.
+        """
+        return int(self._seqs[slot]) == seq
+
+    def close(self):
+        """
+        Detach this process from the shared memory block
+        """
+        self._seqs = None
+        self._frames = None
+        self.shm.close()
+
+    def unlink(self):
+        """
+        Free the shared memory block. Call once, from the creating process,
+        after every process has closed it.
+        """
+        self.shm.unlink()
+
+    def __reduce__(self):
+        # sending the ring to another process attaches to the same block
+        return (self.attach, (self.name, self.shape, self.dtype, self.slots))
+
+
+def _attach(name):
+    try:
+        # don't let this process's resource tracker unlink the block on exit
+        return shared_memory.SharedMemory(name=name, track=False)
+    except TypeError:
+        # track was added in Python 3.13
+        return shared_memory.SharedMemory(name=name)
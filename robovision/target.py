@@ -1,6 +1,21 @@
 """
 Determine target characteristics
 
+get_contours() normally searches the whole frame. With set_roi() it
+searches only a region of interest, either fixed or following the last
+detection, so conversion, thresholding and filtering run on far fewer
+pixels. Contours are always in full-frame coordinates, and when nothing
+is found in the region the whole frame is searched instead.
+
+With set_camera_params(), undistort_contour() removes lens distortion from
+a contour, so it can be measured without flattening whole frames. Pass the
+result to the geometry methods, and draw it rather than the original
+contour, since it's in flatten()'s coordinates:
+
+target.set_camera_params(rv.load_camera_params("params.npz"))
+contour = target.undistort_contour(contours[0])
+angle = target.get_skew_angle(contour)
+
 Author: Tim Poulsen
 Web site: https://timpoulsen.com
 Copyright 2018, Tim Poulsen, all rights reserved
@@ -9,12 +24,67 @@ License: MIT
 import cv2
 import math
 import numpy as np
+from .frame import Frame
+from .roi import clip_roi
+from .undistort import undistort_points
 
 
 class Target():
     def __init__(self):
         self.kernelOpen = np.ones((5, 5))  # for drawing the "open" mask
         self.kernelClose = np.ones((20, 20))  # for draing the "closed" mask
+        self.camera_params = None
+        self.set_roi()
+
+    def set_camera_params(self, cam_matrix=None, dist_coeff=None, image_size=None):
+        """
+        Set the camera parameters undistort_contour() uses. See
+        undistort_points() for the parameters; call with no arguments to
+        clear them.
+
+        :param cam_matrix: Camera matrix, or the parameters returned by
+                           load_camera_params() (then omit dist_coeff)
+        :param dist_coeff: Distortion coefficients
+        :param image_size: Optional, (width, height) of the frames, to measure
+                           in the coordinates of flatten()'s images
+        """
+        if cam_matrix is None:
+            self.camera_params = None
+            return
+        if dist_coeff is None:
+            cam_matrix, dist_coeff = cam_matrix.mtx, cam_matrix.dist
+        self.camera_params = cam_matrix, dist_coeff, image_size
+
+    def undistort_contour(self, contour):
+        """
+        Remove lens distortion from a contour, using the parameters given
+        to set_camera_params()
+
+        :param contour: a CV2 contour (e.g. returned from get_contours)
+        :return: The undistorted contour, or the contour unchanged if no
+                 camera parameters are set
+        """
+        if contour is None or self.camera_params is None:
+            return contour
+        return undistort_points(contour, *self.camera_params)
+
+    def set_roi(self, roi=None, track=False, margin=0.5, fallback=True):
+        """
+        Limit get_contours() to a region of interest
+
+        :param roi: Optional, (x, y, width, height) region to search; None for
+                    the whole frame
+        :param track: Move the region to follow the contours found in each
+                      frame, searching the whole frame until something is found
+        :param margin: With track, how far to extend the region beyond the last
+                       detection on each side, as a fraction of its width/height
+        :param fallback: Search the whole frame when nothing is found in the region
+        """
+        self.static_roi = tuple(int(v) for v in roi) if roi is not None else None
+        self.track = track
+        self.margin = margin
+        self.fallback = fallback
+        self.roi = self.static_roi
 
     def set_color_range(self, lower=(100, 100, 100), upper=(255, 255, 255)):
         self.lower = lower
@@ -24,7 +94,8 @@ class Target():
         '''
         Detect and return contours surrounding colors between the lower
         and upper bounds.
-        :param image: full frame image containing the mirror
+        :param image: full frame image containing the mirror, or a Frame
+                      whose HSV version may be shared with other detectors
         :param mode: contour selection mode, see https://tinyurl.com/y8gx3w6w
         :param sort_method: options for sorting the contours
         :return: Sorted list of countours, largest first
@@ -33,13 +104,14 @@ class Target():
         smallest to largest), left-to-right, right-to-left, top-to-bottom, and
         bottom-to-top
         '''
-        imgHSV = cv2.cvtColor(image, cv2.COLOR_BGR2HSV)
-        mask = cv2.inRange(imgHSV, self.lower, self.upper)
-        # remove noise with morphological "open"
-        maskOpen = cv2.morphologyEx(mask, cv2.MORPH_OPEN, self.kernelOpen)
-        # close up internal holes in contours with "close"
-        maskClose = cv2.morphologyEx(maskOpen, cv2.MORPH_CLOSE, self.kernelClose)
-        _, contours, _ = cv2.findContours(maskClose, mode, cv2.CHAIN_APPROX_SIMPLE)
+        region = clip_roi(self.roi, image.shape)
+        contours = self._find_contours(image, mode, region)
+        if region is not None and len(contours) == 0 and self.fallback:
+            # lost the target; look everywhere
+            region = None
+            contours = self._find_contours(image, mode, region)
+        if self.track:
+            self.roi = self._follow(contours, image.shape)
         if sort_method == "none":
             return contours
         elif sort_method == "area":
@@ -49,6 +121,38 @@ class Target():
         else:
             return self.sort_contours(contours, method=sort_method)
 
+    def _find_contours(self, image, mode, region):
+        if region is None:
+            x, y = 0, 0
+            if isinstance(image, Frame):
+                imgHSV = image.hsv
+            else:
+                imgHSV = cv2.cvtColor(image, cv2.COLOR_BGR2HSV)
+        else:
+            x, y, w, h = region
+            imgHSV = cv2.cvtColor(image[y:y + h, x:x + w], cv2.COLOR_BGR2HSV)
+        mask = cv2.inRange(imgHSV, self.lower, self.upper)
+        # remove noise with morphological "open"
+        maskOpen = cv2.morphologyEx(mask, cv2.MORPH_OPEN, self.kernelOpen)
+        # close up internal holes in contours with "close"
+        maskClose = cv2.morphologyEx(maskOpen, cv2.MORPH_CLOSE, self.kernelClose)
+        # OpenCV 3 returns (image, contours, hierarchy), 4 just the last two
+        return cv2.findContours(maskClose, mode, cv2.CHAIN_APPROX_SIMPLE,
+                                offset=(x, y))[-2]
+
+    def _follow(self, contours, shape):
+        """
+        The region to search next frame: around everything found in this one,
+        or the static region (if any) when nothing was found
+        """
+        if len(contours) == 0:
+            return self.static_roi
+        x, y, w, h = cv2.boundingRect(np.concatenate(contours))
+        # leave room for movement and for the morphology kernels to work
+        pad_x = int(w * self.margin) + self.kernelClose.shape[1]
+        pad_y = int(h * self.margin) + self.kernelClose.shape[0]
+        return clip_roi((x - pad_x, y - pad_y, w + 2 * pad_x, h + 2 * pad_y), shape)
+
     @staticmethod
     def get_rectangle(for_contour=None):
         """
@@ -90,7 +194,7 @@ class Target():
             return None
         rect = cv2.minAreaRect(for_contour)
         box = cv2.boxPoints(rect)
-        return np.int0(box)
+        return np.intp(box)
 
     @staticmethod
     def get_skew_angle(for_contour=None):
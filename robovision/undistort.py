@@ -0,0 +1,166 @@
+"""
+Lens distortion removal with cached maps
+
+cv2.undistort works out where every output pixel comes from on every call.
+For a fixed camera that never changes, so Undistorter works it out once
+per frame size (cv2.initUndistortRectifyMap) as compact fixed-point maps
+and then only has to cv2.remap each frame.
+
+undistorter = rv.Undistorter(cam_matrix, dist_coeff)
+frame = undistorter.undistort(frame)
+
+flatten() uses the same cache, so existing code gets faster as is. The
+results are the same as cv2.undistort's, which builds the same fixed-point
+maps internally on every call.
+
+Often only a target's coordinates need correcting, not the whole picture.
+undistort_points() corrects contours or points directly, which for a few
+dozen points costs next to nothing:
+
+contours = target.get_contours(frame)
+corrected = rv.undistort_points(contours[0], params, image_size=(w, h))
+
+Author: Tim Poulsen
+Web site: https://timpoulsen.com
+Copyright 2018, Tim Poulsen, all rights reserved
+License: MIT
+"""
+import cv2
+import numpy as np
+import threading
+
+
+class Undistorter(object):
+    def __init__(self, cam_matrix, dist_coeff, alpha=1, crop=False,
+                 interpolation=cv2.INTER_LINEAR):
+        """
+        :param cam_matrix: 3x3 camera matrix, e.g. from auto_calibrate.py
+        :param dist_coeff: Distortion coefficients
+        :param alpha: 0 to 1; 0 keeps only valid pixels (zooming in), 1 keeps
+                      every source pixel (leaving black areas at the edges)
+        :param crop: Return only the region of valid pixels, see `roi()`
+        :param interpolation: OpenCV interpolation flag used by remap
+        """
+        self.cam_matrix = np.asarray(cam_matrix, dtype=np.float64)
+        self.dist_coeff = np.asarray(dist_coeff, dtype=np.float64)
+        self.alpha = alpha
+        self.crop = crop
+        self.interpolation = interpolation
+        self._maps = {}
+        self._lock = threading.Lock()
+
+    def undistort(self, image, dst=None):
+        """
+        Remove lens distortion from an image
+
+        :param image: OpenCV image, any number of channels
+        :param dst: Optional, image of the same size to write the result into
+        :return: Undistorted image; with crop, a view of just the valid region
+        """
+        h, w = image.shape[:2]
+        map1, map2, new_matrix, roi = self.maps((w, h))
+        dst = cv2.remap(image, map1, map2, self.interpolation, dst=dst)
+        if self.crop:
+            x, y, rw, rh = roi
+            return dst[y:y + rh, x:x + rw]
+        return dst
+
+    def undistort_points(self, points, size):
+        """
+        Move points to where they are in this Undistorter's output images
+
+        :param points: Contour or array of (x, y) points
+        :param size: (width, height) of the frames the points came from
+        :return: Float32 array of the corrected points, in the same shape
+        """
+        return _undistort_points(points, self.cam_matrix, self.dist_coeff,
+                                 self.camera_matrix(size))
+
+    def camera_matrix(self, size):
+        """
+        :param size: (width, height) of the frames
+        :return: Camera matrix of the undistorted frames
+        """
+        return self.maps(size)[2]
+
+    def roi(self, size):
+        """
+        :param size: (width, height) of the frames
+        :return: (x, y, width, height) of the region of the undistorted frames
+                 containing only valid pixels
+        """
+        return self.maps(size)[3]
+
+    def add_maps(self, size, map1, map2, new_matrix, roi):
+        """
+        Use maps computed earlier (e.g. stored with the camera parameters)
+        rather than computing them on first use
+
+        :param size: (width, height) of the frames the maps are for
+        :param map1: First map, as returned by maps()
+        :param map2: Second map
+        :param new_matrix: Camera matrix of the undistorted frames
+        :param roi: (x, y, width, height) of the valid pixel region
+        """
+        with self._lock:
+            self._maps[tuple(int(v) for v in size)] = map1, map2, new_matrix, tuple(roi)
+
+    def maps(self, size):
+        """
+        The remap maps for a frame size, computed on first use
+
+        :param size: (width, height) of the frames
+        :return: Tuple of the two fixed-point maps, the new camera matrix and
+                 the valid pixel region
+        """
+        size = tuple(int(v) for v in size)
+        maps = self._maps.get(size)
+        if maps is None:
+            with self._lock:
+                maps = self._maps.get(size)
+                if maps is None:
+                    new_matrix, roi = cv2.getOptimalNewCameraMatrix(
+                        self.cam_matrix, self.dist_coeff, size, self.alpha, size)
+                    # CV_16SC2 gives integer coordinates plus a table index for
+                    # the fractional part, which remaps fastest
+                    map1, map2 = cv2.initUndistortRectifyMap(
+                        self.cam_matrix, self.dist_coeff, None, new_matrix, size, cv2.CV_16SC2)
+                    maps = self._maps[size] = map1, map2, new_matrix, tuple(roi)
+        return maps
+
+
+def undistort_points(points, cam_matrix, dist_coeff=None, image_size=None):
+    """
+    Remove lens distortion from contours or points rather than whole images
+
+    :param points: Contour (as from Target.get_contours) or array of (x, y)
+                   points, or a list of them
+    :param cam_matrix: Camera matrix, or the parameters returned by
+                       load_camera_params() (then omit dist_coeff)
+    :param dist_coeff: Distortion coefficients
+    :param image_size: Optional, (width, height) of the frame. When given,
+                       the points match the images flatten() produces;
+                       otherwise they're in the original camera's pixels.
+    :return: Float32 array of the corrected points in the same shape, or a
+             list of them
+    """
+    if dist_coeff is None:
+        cam_matrix, dist_coeff = cam_matrix.mtx, cam_matrix.dist
+    cam_matrix = np.asarray(cam_matrix, dtype=np.float64)
+    dist_coeff = np.asarray(dist_coeff, dtype=np.float64)
+    new_matrix = cam_matrix
+    if image_size is not None:
+        new_matrix, _ = cv2.getOptimalNewCameraMatrix(cam_matrix, dist_coeff, tuple(image_size),
+                                                      1, tuple(image_size))
+    if isinstance(points, (list, tuple)) and len(points) > 0 and np.ndim(points[0]) > 1:
+        return [_undistort_points(p, cam_matrix, dist_coeff, new_matrix) for p in points]
+    return _undistort_points(points, cam_matrix, dist_coeff, new_matrix)
+
+
+def _undistort_points(points, cam_matrix, dist_coeff, new_matrix):
+    points = np.asarray(points, dtype=np.float32)
+    if points.size == 0:
+        return points
+    corrected = cv2.undistortPoints(points.reshape(-1, 1, 2), cam_matrix, dist_coeff,
+                                    P=new_matrix)
+    return corrected.reshape(points.shape)
@@ -1,10 +1,56 @@
 '''
 Abstract base class (aka 'interface') for video interfaces
+
+Sources publish each captured frame with _set_frame(), which bumps a
+per-frame sequence number and wakes any consumer blocked in
+wait_for_frame(). Consumers remember the last sequence number they saw
+and so never process the same frame twice.
+
+When created with `buffers=N`, a source captures into a FrameRing of
+preallocated arrays (see _next_buffer()). Frames handed out by
+read_frame() are then copies, while lease_frame() gives zero-copy,
+read-only access that must be released.
+
+A source that runs out of frames calls _finish(); waits then return
+immediately rather than blocking.
+
+Every frame is stamped with its monotonic capture time; the last
+`stats_window` capture times are kept for rate and frame-age statistics.
+
+Listeners added with add_listener() are called from the capture thread
+with (frame, seq) for every frame; they must return quickly and copy the
+frame if they keep it while buffers are in use.
 '''
 import abc
+import threading
+import time
+from ..deck import Deck
+from .frame_ring import FrameLease, FrameRing
+
+stats_window = 120
 
 
 class AbstractCam(object, metaclass=abc.ABCMeta):
+    def __init__(self, buffers=0):
+        self.running = False
+        self.finished = False
+        # capture settings the device actually accepted, where known
+        self.settings = {}
+        self.current_frame = None
+        self.frame_seq = 0
+        self.frame_time = None
+        self.capture_times = Deck(maxlen=stats_window)
+        self._frame_cond = threading.Condition()
+        self._ring = FrameRing(buffers) if buffers else None
+        self._write_slot = None
+        # frames discarded because every ring slot was leased
+        self.dropped_frames = 0
+        self._listeners = []
+
+    @property
+    def uses_buffers(self):
+        return self._ring is not None
+
     @abc.abstractmethod
     def start(self):
         raise NotImplementedError("You must define a start method")
@@ -16,3 +62,172 @@ class AbstractCam(object, metaclass=abc.ABCMeta):
     @abc.abstractmethod
     def read_frame(self):
         raise NotImplementedError("You must define a read_frame method")
+
+    def wait_for_frame(self, after_seq=0, timeout=None):
+        """
+        Block until a frame newer than `after_seq` has been captured
+
+        :param after_seq: Sequence number of the last frame the caller saw
+        :param timeout: Optional, maximum seconds to wait
+        :return: Tuple of frame and its sequence number; (None, after_seq)
+                 on timeout or if the source stops
+        """
+        with self._frame_cond:
+            if not self._wait(after_seq, timeout):
+                return None, after_seq
+        return self._snapshot()
+
+    def lease_frame(self, after_seq=-1, timeout=None):
+        """
+        Borrow the latest frame without copying it. The buffer won't be
+        reused by the capture thread until the lease is released.
+
+        :param after_seq: Sequence number of the last frame the caller saw;
+                          the default returns the current frame immediately
+        :param timeout: Optional, maximum seconds to wait for a newer frame
+        :return: FrameLease, or None on timeout or if no frame is available
+        """
+        with self._frame_cond:
+            if not self._wait(after_seq, timeout) or self.current_frame is None:
+                return None
+            frame, seq = self.current_frame, self.frame_seq
+            if self._ring is not None:
+                index = self._ring.latest
+                self._ring.lease(index)
+                return FrameLease(frame, seq, lambda: self._release_slot(index))
+        return FrameLease(self._decode(frame), seq)
+
+    def frame_taken(self, seq):
+        """
+        Called by VideoStream when frame `seq` is handed to a consumer.
+        Nothing to do for live cameras; replay sources use it for pacing.
+        """
+        pass
+
+    def capture_time(self, seq):
+        """
+        :return: Monotonic capture time of frame `seq`, or None if it's older
+                 than the stats window
+        """
+        with self._frame_cond:
+            index = self.frame_seq - seq
+            if 0 <= index < len(self.capture_times):
+                return self.capture_times[index]
+        return None
+
+    def capture_fps(self):
+        """
+        :return: Frames per second captured over the stats window, or None
+                 until at least two frames have been captured
+        """
+        with self._frame_cond:
+            if len(self.capture_times) < 2:
+                return None
+            elapsed = self.capture_times[0] - self.capture_times[-1]
+            return (len(self.capture_times) - 1) / elapsed if elapsed > 0 else None
+
+    def add_listener(self, listener):
+        """
+        Register a callable to be invoked as listener(frame, seq) from the
+        capture thread each time a frame is published, and with a frame of
+        None when the source stops
+        """
+        with self._frame_cond:
+            self._listeners = self._listeners + [listener]
+
+    def remove_listener(self, listener):
+        with self._frame_cond:
+            self._listeners = [l for l in self._listeners if l is not listener]
+
+    def _wait(self, after_seq, timeout):
+        # caller holds self._frame_cond
+        return self._frame_cond.wait_for(
+            lambda: self.frame_seq > after_seq or not self.running or self.finished,
+            timeout) and self.frame_seq > after_seq
+
+    def _get_frame(self):
+        """
+        The latest frame, copied when it lives in a reusable ring buffer
+        """
+        return self._snapshot()[0]
+
+    def _snapshot(self):
+        """
+        :return: Tuple of the latest frame (see _get_frame) and its sequence number
+        """
+        with self._frame_cond:
+            frame, seq = self.current_frame, self.frame_seq
+            if self._ring is not None and frame is not None:
+                return frame.copy(), seq
+        return self._decode(frame), seq
+
+    def _decode(self, frame):
+        """
+        Turn what the capture thread published into an image. Identity here;
+        sources that publish undecoded data (e.g. IPcam with lazy_decode)
+        override it so decoding happens only when a consumer asks.
+        """
+        return frame
+
+    def _next_buffer(self):
+        """
+        Reserve a ring slot for the next capture. Called from the capture
+        thread before reading, e.g. `self.cam.read(self._next_buffer())`.
+
+        :return: Preallocated array to capture into, or None to allocate
+        """
+        if self._ring is None:
+            return None
+        with self._frame_cond:
+            self._write_slot, buffer = self._ring.writable()
+        return buffer
+
+    def _set_frame(self, frame):
+        """
+        Publish a newly captured frame and wake waiting consumers. Called
+        from the capture thread. With a ring whose slots are all leased (and
+        which can't grow any more), the frame is dropped.
+        """
+        now = time.monotonic()
+        with self._frame_cond:
+            if self._ring is not None:
+                if self._write_slot is None:
+                    self._write_slot, _ = self._ring.writable()
+                    if self._write_slot is None:
+                        self.dropped_frames += 1
+                        return
+                self._ring.commit(self._write_slot, frame)
+                self._write_slot = None
+            self.current_frame = frame
+            self.frame_seq += 1
+            self.frame_time = now
+            self.capture_times.push(now)
+            seq = self.frame_seq
+            listeners = self._listeners
+            self._frame_cond.notify_all()
+        if listeners:
+            frame = self._decode(frame)
+        for listener in listeners:
+            listener(frame, seq)
+
+    def _release_slot(self, index):
+        with self._frame_cond:
+            self._ring.release(index)
+
+    def _finish(self):
+        """
+        Mark the source as having no more frames (e.g. the end of a file) and
+        wake consumers, which then stop waiting for new frames
+        """
+        self.finished = True
+        self._wake_waiters()
+
+    def _wake_waiters(self):
+        """
+        Wake consumers blocked in wait_for_frame(), e.g. after stopping
+        """
+        with self._frame_cond:
+            self._frame_cond.notify_all()
+            listeners = self._listeners
+        for listener in listeners:
+            listener(None, self.frame_seq)
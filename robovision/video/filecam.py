@@ -0,0 +1,136 @@
+"""
+Video file and image sequence replay. Generally, don't access this library
+directly. Instead, use the video.py library.
+
+Replays a video file, or a directory of images in filename order, through
+the same threaded interface as a live camera so whole pipelines can be
+benchmarked and regression tested without hardware.
+
+In the default throughput mode the next frame is published as soon as the
+previous one has been handed out by VideoStream, so every frame is
+processed exactly once and as fast as the consumer allows. With
+realtime=True frames are published at the recorded frame rate (or `fps`),
+and frames the consumer is too slow for are dropped, as they would be with
+a live camera. Images in a directory that can't be read are skipped.
+"""
+import cv2
+import os
+import threading
+import time
+from .abstract_cam import AbstractCam
+from ..image_files import list_images
+
+
+class Filecam(AbstractCam):
+    def __init__(self, path="", realtime=False, fps=None, loop=False, buffers=0):
+        """
+        :param path: Video file, or directory of images
+        :param realtime: Publish at the recorded frame rate, dropping frames the
+                         consumer doesn't keep up with
+        :param fps: Optional, replay rate overriding the file's own (and the
+                    30 fps assumed for image directories)
+        :param loop: Start over at the end rather than finishing
+        :param buffers: Number of ring buffers to capture into, see AbstractCam
+        """
+        super(Filecam, self).__init__(buffers=buffers)
+        self.path = path
+        self.realtime = realtime
+        self.fps = fps
+        self.loop = loop
+        self.cam = None
+        self.files = None
+        self._taken = 0
+
+    def start(self):
+        if os.path.isdir(self.path):
+            self.files = list_images(self.path)
+            if len(self.files) == 0:
+                raise IOError("No images found in {}".format(self.path))
+            recorded_fps = None
+        else:
+            self.cam = cv2.VideoCapture(self.path)
+            if not self.cam.isOpened():
+                raise IOError("Unable to open {}".format(self.path))
+            recorded_fps = self.cam.get(cv2.CAP_PROP_FPS)
+        self.fps = self.fps or recorded_fps or 30.
+        self.finished = False
+        self.ct = threading.Thread(target=self._capture_image_thread, name="Filecam")
+        self.ct.daemon = True
+        self.running = True
+        self.ct.start()
+
+    def stop(self):
+        self.running = False
+        self._wake_waiters()
+        self.ct.join()
+        if self.cam is not None:
+            self.cam.release()
+
+    def read_frame(self):
+        if self.running is True:
+            return self._get_frame()
+
+    def frame_taken(self, seq):
+        with self._frame_cond:
+            if seq > self._taken:
+                self._taken = seq
+                self._frame_cond.notify_all()
+
+    def _capture_image_thread(self):
+        index = 0
+        started = time.monotonic()
+        while self.running is True:
+            if self.realtime:
+                behind = time.monotonic() - (started + index / self.fps)
+                if behind < 0:
+                    time.sleep(-behind)
+                elif behind > 1. / self.fps and self._skip_frame(index):
+                    # too late for this frame; drop it without decoding
+                    index += 1
+                    continue
+            else:
+                with self._frame_cond:
+                    self._frame_cond.wait_for(
+                        lambda: self._taken >= self.frame_seq or not self.running)
+                if self.running is False:
+                    break
+            frame = self._read_frame(index)
+            if frame is None:
+                if self.files is not None and index < len(self.files):
+                    # unreadable image; go on to the next one
+                    index += 1
+                    continue
+                index, started = self._rewind(index)
+                if index is None:
+                    break
+                continue
+            self._set_frame(frame)
+            index += 1
+
+    def _read_frame(self, index):
+        if self.files is not None:
+            if index >= len(self.files):
+                return None
+            return cv2.imread(self.files[index])
+        success, frame = self.cam.read(self._next_buffer())
+        return frame if success else None
+
+    def _skip_frame(self, index):
+        if self.files is not None:
+            return index < len(self.files)
+        return self.cam.grab()
+
+    def _rewind(self, index):
+        """
+        Handle the end of the file: start over if looping, otherwise finish
+
+        :return: Tuple of the next frame index and replay start time, or
+                 (None, None) when finished
+        """
+        # don't loop over a directory none of whose images could be read
+        if self.loop and index > 0 and self.frame_seq > 0:
+            if self.cam is not None:
+                self.cam.set(cv2.CAP_PROP_POS_FRAMES, 0)
+            return 0, time.monotonic()
+        self._finish()
+        return None, None
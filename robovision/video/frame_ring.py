@@ -0,0 +1,91 @@
+"""
+Small ring of reusable frame buffers. Generally, don't access this library
+directly. Sources create one when given `buffers=N` and capture straight
+into its arrays, so steady-state capture allocates no new frames.
+
+Consumers take a FrameLease on the newest slot; a leased slot is never
+handed back to the producer for writing until the lease is released.
+"""
+
+
+class FrameRing(object):
+    """
+    Bookkeeping for a fixed set of frame buffers. Not thread-safe on its
+    own; callers hold the owning source's frame lock.
+    """
+    def __init__(self, size=3):
+        # one slot holds the latest frame and one is being written, so
+        # anything less than two would make the producer wait on consumers
+        size = max(int(size), 2)
+        # leased slots make the ring grow, but leaked leases mustn't make
+        # it grow forever
+        self.max_size = size * 2
+        self.buffers = [None] * size
+        self.leases = [0] * size
+        self.latest = None
+        self._next = 0
+
+    def writable(self):
+        """
+        Pick a slot the producer may overwrite: not the latest frame and
+        not leased by any consumer. Grows the ring if every slot is in use,
+        up to twice its original size.
+
+        :return: Tuple of slot index and its buffer (None until first use),
+                 or (None, None) if every slot is in use and the ring can't
+                 grow, in which case the frame should be dropped
+        """
+        size = len(self.buffers)
+        for i in range(size):
+            index = (self._next + i) % size
+            if index != self.latest and self.leases[index] == 0:
+                self._next = (index + 1) % size
+                return index, self.buffers[index]
+        if size >= self.max_size:
+            return None, None
+        self.buffers.append(None)
+        self.leases.append(0)
+        return size, None
+
+    def commit(self, index, frame):
+        """
+        Record `frame` as the contents of slot `index` and make it the latest.
+        The frame is usually the slot's own buffer, filled in place.
+        """
+        self.buffers[index] = frame
+        self.latest = index
+
+    def lease(self, index):
+        self.leases[index] += 1
+
+    def release(self, index):
+        if self.leases[index] > 0:
+            self.leases[index] -= 1
+
+
+class FrameLease(object):
+    """
+    A read-only view of a captured frame. Call release() (or use it as a
+    context manager) when done so the producer can reuse the buffer.
+
+    with vs.lease_frame(wait_new=True) as lease:
+        contours = target.get_contours(lease.frame)
+    """
+    def __init__(self, frame, seq, release_func=None):
+        if frame is not None:
+            frame = frame.view()
+            frame.flags.writeable = False
+        self.frame = frame
+        self.seq = seq
+        self._release_func = release_func
+
+    def release(self):
+        if self._release_func is not None:
+            self._release_func()
+            self._release_func = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.release()
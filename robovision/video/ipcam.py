@@ -1,38 +1,125 @@
 """
 IP camera library. Generally, don't access this library directly. Instead, use
 the video.py library.
+
+By default frames come from cv2.VideoCapture. With native=True, an
+MJPEGReader holds a persistent connection to the camera and only the newest
+complete JPEG is decoded, which avoids VideoCapture's internal buffering
+(and stale frames) and reconnects if the stream drops.
+
+The native client can also decode at 1/2, 1/4 or 1/8 scale and/or in
+grayscale, and with lazy_decode=True it keeps only the raw JPEG bytes and
+decodes when a consumer reads a frame, so frames nobody reads are never
+decoded at all.
 """
 import cv2
+import numpy as np
 import threading
 import time
 from .abstract_cam import AbstractCam
+from .mjpeg import MJPEGReader
+
+_decode_flags = {
+    (1, False): cv2.IMREAD_COLOR,
+    (2, False): cv2.IMREAD_REDUCED_COLOR_2,
+    (4, False): cv2.IMREAD_REDUCED_COLOR_4,
+    (8, False): cv2.IMREAD_REDUCED_COLOR_8,
+    (1, True): cv2.IMREAD_GRAYSCALE,
+    (2, True): cv2.IMREAD_REDUCED_GRAYSCALE_2,
+    (4, True): cv2.IMREAD_REDUCED_GRAYSCALE_4,
+    (8, True): cv2.IMREAD_REDUCED_GRAYSCALE_8,
+}
 
 
 class IPcam(AbstractCam):
-    def __init__(self, ipcam_url=''):
+    def __init__(self, ipcam_url='', buffers=0, native=False, lazy_decode=False,
+                 decode_scale=1, grayscale=False):
+        """
+        :param ipcam_url: URL of the camera's MJPEG stream
+        :param buffers: Number of ring buffers to capture into, see AbstractCam
+        :param native: Use the built-in MJPEG client rather than cv2.VideoCapture
+        :param lazy_decode: Decode only when a frame is read; implies native
+        :param decode_scale: 1, 2, 4 or 8, decode at 1/scale resolution; implies
+                             native when not 1
+        :param grayscale: Decode to a single-channel image; implies native
+        """
+        if (decode_scale, grayscale) not in _decode_flags:
+            raise ValueError("decode_scale must be 1, 2, 4 or 8")
+        # raw JPEG bytes are never held in a ring buffer
+        super(IPcam, self).__init__(buffers=0 if lazy_decode else buffers)
         self.ipcam_url = ipcam_url
-        self.running = False
-        self.current_frame = None
+        self.native = native or lazy_decode or decode_scale != 1 or grayscale
+        self.lazy_decode = lazy_decode
+        self.decode_flags = _decode_flags[(decode_scale, grayscale)]
+        self._decode_lock = threading.Lock()
+        self._decoded = None, None
 
     def start(self):
-        self.cam = cv2.VideoCapture(self.ipcam_url)
-        self.ct = threading.Thread(target=self._capture_image_thread, name="IPcam")
+        if self.lazy_decode:
+            # the reader publishes the raw bytes itself; there's nothing
+            # for a capture thread to do
+            self.reader = MJPEGReader(self.ipcam_url, callback=self._set_frame)
+            self.running = True
+            self.reader.start()
+            return
+        if self.native:
+            self.reader = MJPEGReader(self.ipcam_url)
+            self.reader.start()
+            target = self._decode_image_thread
+        else:
+            self.cam = cv2.VideoCapture(self.ipcam_url)
+            target = self._capture_image_thread
+        self.ct = threading.Thread(target=target, name="IPcam")
         self.ct.daemon = True
         self.running = True
         self.ct.start()
 
     def stop(self):
         self.running = False
-        self.ct.join()
-        self.cam.release()
+        self._wake_waiters()
+        if self.native:
+            self.reader.stop()
+            if not self.lazy_decode:
+                self.ct.join()
+        else:
+            self.ct.join()
+            self.cam.release()
 
     def read_frame(self):
         if self.running is True:
-            return self.current_frame
+            return self._get_frame()
 
     def _capture_image_thread(self):
         while self.running is True:
-            success, frame = self.cam.read()
+            success, frame = self.cam.read(self._next_buffer())
             if success:
-                self.current_frame = frame
-            time.sleep(0.005)
+                self._set_frame(frame)
+            else:
+                # back off briefly rather than spinning on a failed read
+                time.sleep(0.005)
+
+    def _decode_image_thread(self):
+        seq = 0
+        while self.running is True:
+            # any JPEGs that arrived while the last one was decoding are
+            # skipped; only the newest is decoded
+            jpeg, seq = self.reader.wait_for_jpeg(seq)
+            if jpeg is None:
+                continue
+            frame = self._imdecode(jpeg)
+            if frame is not None:
+                self._set_frame(frame)
+
+    def _decode(self, frame):
+        if not self.lazy_decode or frame is None:
+            return frame
+        # every consumer of the same JPEG shares one decode
+        with self._decode_lock:
+            jpeg, decoded = self._decoded
+            if jpeg is not frame:
+                decoded = self._imdecode(frame)
+                self._decoded = frame, decoded
+            return decoded
+
+    def _imdecode(self, jpeg):
+        return cv2.imdecode(np.frombuffer(jpeg, dtype=np.uint8), self.decode_flags)
@@ -11,9 +11,9 @@ from .abstract_cam import AbstractCam
 class Jetsoncam(AbstractCam):
     cameraString = ""
 
-    def __init__(self, cam="usb", ip_address="", cam_num=0, resolution=(1920, 1080)):
-        self.running = False
-        self.current_frame = None
+    def __init__(self, cam="usb", ip_address="", cam_num=0, resolution=(1920, 1080),
+                 buffers=0):
+        super(Jetsoncam, self).__init__(buffers=buffers)
         w, h = resolution
         if cam == "usb":
             self.cameraString = self._get_usb_string(cam_num, resolution[0], resolution[1])
@@ -34,6 +34,7 @@ class Jetsoncam(AbstractCam):
 
     def stop(self):
         self.running = False
+        self._wake_waiters()
         self.ct.join()
         self.stream.close()
         self.rawCapture.close()
@@ -41,14 +42,16 @@ class Jetsoncam(AbstractCam):
 
     def read_frame(self):
         if self.running is True:
-            return self.current_frame
+            return self._get_frame()
 
     def _capture_image_thread(self):
         while self.running is True:
-            success, frame = self.cam.read()
+            success, frame = self.cam.read(self._next_buffer())
             if success:
-                self.current_frame = frame
-            time.sleep(0.005)
+                self._set_frame(frame)
+            else:
+                # back off briefly rather than spinning on a failed read
+                time.sleep(0.005)
 
     def _get_rtsp_string(uri, width, height, latency=0):
         return ("rtspsrc location={} latency={} ! rtph264depay ! h264parse ! omxh264dec ! "
@@ -0,0 +1,186 @@
+"""
+Persistent MJPEG-over-HTTP client. Generally, don't access this library
+directly. Instead, use the video.py library with
+`VideoStream(source="ipcam", ipcam_url=..., ipcam_native=True)`.
+
+Unlike cv2.VideoCapture, which buffers frames internally, the reader keeps
+only the newest complete JPEG from the multipart stream; older ones are
+discarded without being decoded. A dropped connection is re-established
+with exponential backoff; `last_error` holds the exception that caused the
+most recent disconnect or failed attempt, so a bad URL (e.g. an HTTP 404
+every time) can be told apart from a camera that's briefly unreachable.
+"""
+import base64
+import http.client
+import socket
+import threading
+from urllib.parse import urlsplit
+
+
+class MJPEGReader(object):
+    def __init__(self, url, timeout=5., min_backoff=0.1, max_backoff=5., callback=None):
+        """
+        :param url: http(s) URL of the MJPEG stream, optionally with user:pass@
+        :param timeout: Socket timeout in seconds; a stalled stream reconnects
+        :param min_backoff: Seconds to wait before the first reconnect attempt
+        :param max_backoff: Upper bound on the wait between reconnect attempts
+        :param callback: Optional, called from the reader thread with the bytes
+                         of each JPEG as it arrives
+        """
+        self.url = url
+        self.timeout = timeout
+        self.min_backoff = min_backoff
+        self.max_backoff = max_backoff
+        self.callback = callback
+        self.running = False
+        self.connected = False
+        self.reconnects = 0
+        self.last_error = None
+        self.jpeg = None
+        self.seq = 0
+        self._conn = None
+        self._cond = threading.Condition()
+        self._wake = threading.Event()
+
+    def start(self):
+        self.rt = threading.Thread(target=self._read_thread, name="MJPEGReader")
+        self.rt.daemon = True
+        self.running = True
+        self._wake.clear()
+        self.rt.start()
+
+    def stop(self):
+        self.running = False
+        self._wake.set()
+        conn = self._conn
+        if conn is not None and conn.sock is not None:
+            # unblock a read in progress
+            try:
+                conn.sock.shutdown(socket.SHUT_RDWR)
+            except OSError:
+                pass
+        with self._cond:
+            self._cond.notify_all()
+        self.rt.join()
+
+    def wait_for_jpeg(self, after_seq=0, timeout=None):
+        """
+        Block until a JPEG newer than `after_seq` has been received
+
+        :return: Tuple of JPEG bytes and sequence number; (None, after_seq)
+                 on timeout or if the reader stops
+        """
+        with self._cond:
+            self._cond.wait_for(lambda: self.seq > after_seq or not self.running,
+                                timeout)
+            if self.seq > after_seq:
+                return self.jpeg, self.seq
+        return None, after_seq
+
+    def _read_thread(self):
+        backoff = self.min_backoff
+        while self.running is True:
+            try:
+                for jpeg in self._stream():
+                    backoff = self.min_backoff
+                    with self._cond:
+                        self.jpeg = jpeg
+                        self.seq += 1
+                        self._cond.notify_all()
+                    if self.callback is not None:
+                        self.callback(jpeg)
+            except (OSError, ValueError, http.client.HTTPException) as e:
+                self.last_error = e
+            finally:
+                self.connected = False
+                if self._conn is not None:
+                    self._conn.close()
+                    self._conn = None
+            if self.running is False:
+                break
+            self._wake.wait(backoff)
+            backoff = min(backoff * 2, self.max_backoff)
+            self.reconnects += 1
+
+    def _stream(self):
+        """
+        Connect and yield the bytes of each JPEG in the multipart response
+        """
+        parts = urlsplit(self.url)
+        if parts.scheme == "https":
+            conn = http.client.HTTPSConnection(parts.hostname, parts.port, timeout=self.timeout)
+        else:
+            conn = http.client.HTTPConnection(parts.hostname, parts.port, timeout=self.timeout)
+        self._conn = conn
+        headers = {}
+        if parts.username:
+            credentials = "{}:{}".format(parts.username, parts.password or "")
+            headers["Authorization"] = "Basic " + \
+                base64.b64encode(credentials.encode()).decode()
+        path = parts.path or "/"
+        if parts.query:
+            path += "?" + parts.query
+        conn.request("GET", path, headers=headers)
+        response = conn.getresponse()
+        if response.status != 200:
+            raise http.client.HTTPException("MJPEG stream returned {}".format(response.status))
+        boundary = _get_boundary(response.getheader("Content-Type", ""))
+        self.connected = True
+        while self.running is True:
+            part_headers = _read_part_headers(response)
+            length = part_headers.get("content-length")
+            if length is not None:
+                jpeg = response.read(int(length))
+                if len(jpeg) < int(length):
+                    raise ConnectionError("MJPEG stream ended mid-frame")
+            elif boundary is not None:
+                jpeg = _read_until_boundary(response, boundary)
+            else:
+                raise ValueError("MJPEG part has neither Content-Length nor a boundary")
+            yield jpeg
+
+
+def _get_boundary(content_type):
+    for param in content_type.split(";")[1:]:
+        name, _, value = param.strip().partition("=")
+        if name.lower() == "boundary":
+            value = value.strip('"')
+            # some cameras include the leading dashes in the header value
+            return ("--" + value.lstrip("-")).encode()
+    return None
+
+
+def _read_part_headers(response):
+    """
+    Skip the boundary line and read a part's headers, lower-cased
+    """
+    headers = {}
+    while True:
+        line = response.readline()
+        if not line:
+            raise ConnectionError("MJPEG stream closed")
+        line = line.strip()
+        if not line:
+            if headers:
+                return headers
+            continue
+        if line.startswith(b"--"):
+            continue
+        name, _, value = line.partition(b":")
+        headers[name.strip().lower().decode("latin-1")] = value.strip().decode("latin-1")
+
+
+def _read_until_boundary(response, boundary):
+    """
+    Read a part with no Content-Length, which ends at the next boundary line
+    """
+    lines = []
+    while True:
+        line = response.readline()
+        if not line:
+            raise ConnectionError("MJPEG stream closed")
+        if line.startswith(boundary):
+            # JPEG data ends with the FFD9 marker, so this only drops the
+            # CRLF that precedes the boundary
+            return b"".join(lines).rstrip(b"\r\n")
+        lines.append(line)
@@ -9,10 +9,9 @@ from picamera import PiCamera
 
 
 class Picam(AbstractCam):
-    def __init__(self, resolution=(320, 240)):
+    def __init__(self, resolution=(320, 240), buffers=0):
+        super(Picam, self).__init__(buffers=buffers)
         self.resolution = resolution
-        self.running = False
-        self.current_frame = None
 
     def start(self):
         self.cam = PiCamera()
@@ -28,6 +27,7 @@ class Picam(AbstractCam):
 
     def stop(self):
         self.running = False
+        self._wake_waiters()
         self.ct.join()
         self.stream.close()
         self.rawCapture.close()
@@ -35,9 +35,13 @@ class Picam(AbstractCam):
 
     def read_frame(self):
         if self.running is True:
-            return self.current_frame
+            return self._get_frame()
 
     def _capture_image_thread(self):
         for f in self.stream:
-            self.current_frame = f.array
+            # picamera allocates a fresh array per frame, so there's no
+            # ring buffer to capture into here
+            self._set_frame(f.array)
             self.rawCapture.truncate(0)
+            if self.running is False:
+                break
@@ -1,21 +1,54 @@
 """
 Webcam library. Generally, don't access this library directly. Instead, use
 the video.py library.
+
+Capture settings (resolution, fps, FOURCC, buffer size, exposure) are
+applied when the camera is opened. Drivers silently ignore or round
+values they don't support, so what was actually accepted is read back into
+`settings`.
 """
 import cv2
 import threading
 import time
 from .abstract_cam import AbstractCam
 
+# CAP_PROP_AUTO_EXPOSURE values for (auto, manual), which differ by backend;
+# on others the auto exposure mode is left alone
+auto_exposure_values = {
+    "V4L2": (3, 1),  # aperture priority, manual
+    "DSHOW": (0.75, 0.25),
+}
+
 
 class Webcam(AbstractCam):
-    def __init__(self, cam_id=0):
+    def __init__(self, cam_id=0, buffers=0, resolution=None, fps=None, fourcc=None,
+                 buffer_size=None, exposure=None):
+        """
+        :param cam_id: Camera number
+        :param buffers: Number of ring buffers to capture into, see AbstractCam
+        :param resolution: Optional, (width, height) to capture at
+        :param fps: Optional, frame rate to request
+        :param fourcc: Optional, four character pixel format such as "MJPG",
+                       which most USB cameras need for high frame rates
+        :param buffer_size: Optional, frames buffered by the driver; 1 keeps
+                            frames as fresh as possible
+        :param exposure: Optional, "auto" or a manual exposure value (units are
+                         driver specific). Switching between auto and manual
+                         exposure is only supported with the V4L2 and
+                         DirectShow backends; elsewhere "auto" does nothing
+                         and a value is set without changing the mode.
+        """
+        super(Webcam, self).__init__(buffers=buffers)
         self.cam_id = cam_id
-        self.running = False
-        self.current_frame = None
+        self.resolution = resolution
+        self.fps = fps
+        self.fourcc = fourcc
+        self.buffer_size = buffer_size
+        self.exposure = exposure
 
     def start(self):
         self.cam = cv2.VideoCapture(self.cam_id)
+        self._apply_settings()
         self.ct = threading.Thread(target=self._capture_image_thread, name="Webcam")
         self.ct.daemon = True
         self.running = True
@@ -23,16 +56,61 @@ class Webcam(AbstractCam):
 
     def stop(self):
         self.running = False
+        self._wake_waiters()
         self.ct.join()
         self.cam.release()
 
     def read_frame(self):
         if self.running is True:
-            return self.current_frame
+            return self._get_frame()
+
+    def _apply_settings(self):
+        # the pixel format determines which resolutions and rates are
+        # available, so it has to be set first
+        if self.fourcc is not None:
+            self.cam.set(cv2.CAP_PROP_FOURCC, cv2.VideoWriter_fourcc(*self.fourcc))
+        if self.resolution is not None:
+            self.cam.set(cv2.CAP_PROP_FRAME_WIDTH, self.resolution[0])
+            self.cam.set(cv2.CAP_PROP_FRAME_HEIGHT, self.resolution[1])
+        if self.fps is not None:
+            self.cam.set(cv2.CAP_PROP_FPS, self.fps)
+        if self.buffer_size is not None:
+            self.cam.set(cv2.CAP_PROP_BUFFERSIZE, self.buffer_size)
+        if self.exposure is not None:
+            auto, manual = auto_exposure_values.get(self._backend(), (None, None))
+            if self.exposure == "auto":
+                if auto is not None:
+                    self.cam.set(cv2.CAP_PROP_AUTO_EXPOSURE, auto)
+            else:
+                if manual is not None:
+                    self.cam.set(cv2.CAP_PROP_AUTO_EXPOSURE, manual)
+                self.cam.set(cv2.CAP_PROP_EXPOSURE, self.exposure)
+        self.settings = {
+            "resolution": (int(self.cam.get(cv2.CAP_PROP_FRAME_WIDTH)),
+                           int(self.cam.get(cv2.CAP_PROP_FRAME_HEIGHT))),
+            "fps": self.cam.get(cv2.CAP_PROP_FPS),
+            "fourcc": _decode_fourcc(self.cam.get(cv2.CAP_PROP_FOURCC)),
+            "buffer_size": int(self.cam.get(cv2.CAP_PROP_BUFFERSIZE)),
+            "exposure": self.cam.get(cv2.CAP_PROP_EXPOSURE),
+        }
+
+    def _backend(self):
+        try:
+            return self.cam.getBackendName()
+        except cv2.error:
+            # not opened
+            return None
 
     def _capture_image_thread(self):
         while self.running is True:
-            success, frame = self.cam.read()
+            success, frame = self.cam.read(self._next_buffer())
             if success:
-                self.current_frame = frame
-            time.sleep(0.005)
+                self._set_frame(frame)
+            else:
+                # back off briefly rather than spinning on a failed read
+                time.sleep(0.005)
+
+
+def _decode_fourcc(value):
+    value = int(value)
+    return "".join(chr((value >> 8 * i) & 0xFF) for i in range(4))
@@ -7,9 +7,21 @@ Examples:
 from robovision import robovision as rv
 
 vs_webcam = rv.VideoStream(cam_id=0)
+# low-latency webcam capture: MJPG at 640x480, 60 fps, single driver buffer
+vs_webcam = rv.VideoStream(cam_id=0, resolution=(640, 480), fps=60, fourcc="MJPG",
+                           buffer_size=1)
 vs_ipcam = rv.VideoStream(source="ipcam", ipcam_url="http://10.15.18.101/mjpg/video.mjpg")
+# parse the MJPEG stream directly, decoding only the newest frame
+vs_ipcam = rv.VideoStream(source="ipcam", ipcam_url="http://10.15.18.101/mjpg/video.mjpg",
+                          ipcam_native=True)
+# decode only the frames actually read, at quarter resolution in grayscale
+vs_ipcam = rv.VideoStream(source="ipcam", ipcam_url="http://10.15.18.101/mjpg/video.mjpg",
+                          lazy_decode=True, decode_scale=4, grayscale=True)
 vs_picam = rv.VideoStream(source="picam")
 vs_jetson = rv.VideoStream(source="jetson", resolution=(1920, 1080))
+# replay a recording (or a directory of images) for benchmarking and tests
+vs_file = rv.VideoStream(source="file", file_path="match1.avi")
+vs_file = rv.VideoStream(source="file", file_path="frames/", realtime=True, fps=30)
 
 # use any of the above in this way to continuously read frames from the camera
 vs_webcam.start()
@@ -18,32 +30,74 @@ while some_condition is True:
     # do stuff with the frame
 vs_webcam.stop()
 
+# or block until the camera delivers a frame you haven't seen yet
+frame = vs_webcam.read_frame(wait_new=True, timeout=0.5)
+
+# capture into preallocated buffers and borrow frames without copying
+vs = rv.VideoStream(cam_id=0, buffers=4)
+with vs.lease_frame(wait_new=True) as lease:
+    contours = target.get_contours(lease.frame)
+
+# iterate over each new frame exactly once, at most 15 per second
+for frame in vs_webcam.frames(max_fps=15):
+    # do stuff with the frame
+
+# or from within an asyncio coroutine, without blocking the event loop
+async for frame in vs_webcam.aframes():
+    # do stuff with the frame
+
+# check real frame rates, dropped frames and how stale frames are
+print(vs_webcam.stats())
+
 Author: Tim Poulsen
 Web site: https://timpoulsen.com
 Copyright 2018, Tim Poulsen, all rights reserved
 License: MIT
 
 """
+import asyncio
+import numpy as np
 import sys
+import threading
+import time
+from collections import deque
+from .deck import Deck
+from .frame import Frame
 
-# any platform could support a webcam or IP camera so
+# any platform could support a webcam, IP camera or file replay so
 # include the source libraries here
+from .video.abstract_cam import stats_window
+from .video.filecam import Filecam
 from .video.webcam import Webcam
 from .video.ipcam import IPcam
 
-valid_sources = "webcam", "ipcam", "picam", "jetson"
+valid_sources = "webcam", "ipcam", "picam", "jetson", "file"
+drop_policies = "latest", "queue"
 
 
 class VideoStream:
     preprocessor = None
+    last_seq = 0
 
-    def __init__(self, source="webcam", cam_id=0, resolution=(320, 240), ipcam_url=""):
+    def __init__(self, source="webcam", cam_id=0, resolution=None, ipcam_url="",
+                 buffers=0, ipcam_native=False, lazy_decode=False, decode_scale=1,
+                 grayscale=False, file_path="", realtime=False, fps=None, loop=False,
+                 fourcc=None, buffer_size=None, exposure=None, frame_objects=False):
+        self.frame_objects = frame_objects
+        self.delivered = 0
+        self.duplicates = 0
+        self.dropped = 0
+        self._last_delivered = 0
+        self._delivery_times = Deck(maxlen=stats_window)
+        self._frame_ages = Deck(maxlen=stats_window)
         if source not in valid_sources:
             print("Valid sources are {}".format(", ".join(valid_sources)))
             raise "InvalidSource"
 
         if source == "ipcam":
-            self.source = IPcam(ipcam_url=ipcam_url)
+            self.source = IPcam(ipcam_url=ipcam_url, buffers=buffers, native=ipcam_native,
+                                lazy_decode=lazy_decode, decode_scale=decode_scale,
+                                grayscale=grayscale)
         if source == "picam":
             # include the picam library only if on a Pi
             # this is not a meaningful check of whether
@@ -52,7 +106,10 @@ class VideoStream:
                 print("You're not on a Raspberry Pi")
                 raise "InvalidSource"
             from .video.picam import Picam
-            self.source = Picam(resolution=resolution)
+            if resolution is None:
+                self.source = Picam(buffers=buffers)
+            else:
+                self.source = Picam(resolution=resolution, buffers=buffers)
         if source == "jetson":
             # include the jetson library only if on a Jetson
             # this is not a meaningful check of whether
@@ -61,9 +118,14 @@ class VideoStream:
                 print("You're not on a Jetson")
                 raise "InvalidSource"
             from .video.jetsoncam import Jetsoncam
-            self.source = Jetsoncam()
+            self.source = Jetsoncam(buffers=buffers)
         if source == "webcam":
-            self.source = Webcam(cam_id=int(cam_id))
+            self.source = Webcam(cam_id=int(cam_id), buffers=buffers, resolution=resolution,
+                                 fps=fps, fourcc=fourcc, buffer_size=buffer_size,
+                                 exposure=exposure)
+        if source == "file":
+            self.source = Filecam(path=file_path, realtime=realtime, fps=fps, loop=loop,
+                                  buffers=buffers)
 
     def add_preprocessor(self, preprocessor=None):
         self.preprocessor = preprocessor
@@ -71,18 +133,284 @@ class VideoStream:
     def start(self):
         self.source.start()
 
+    def camera_settings(self):
+        """
+        The capture settings the camera actually accepted, which may differ
+        from those requested. Available once the stream has started.
+
+        :return: Dictionary, e.g. resolution, fps, fourcc, buffer_size and
+                 exposure for a webcam; empty if the source doesn't report them
+        """
+        return self.source.settings
+
     def stop(self):
         self.source.stop()
 
-    def read_frame(self):
+    def read_frame(self, wait_new=False, timeout=None):
         """
         Reads a frame, optionally passing it through a Preprocessor if one
         is set. Will start the stream if it"s not running already.
 
-        :return: A single video frame in a format specific to the source
+        :param wait_new: If True, block until a frame newer than the last one
+                         read is available rather than returning the current one
+        :param timeout: Optional, maximum seconds to wait when wait_new is True
+        :return: A single video frame in a format specific to the source, or
+                 None if wait_new timed out
         """
         if not self.source.running:
             self.source.start()
         if self.preprocessor is not None:
-            return self.preprocessor.preprocess(self.source.read_frame)
-        return self.source.read_frame()
+            # the preprocessor never modifies its input, so borrow the frame
+            # rather than paying for a copy out of the ring
+            lease = self.lease_frame(wait_new=wait_new, timeout=timeout)
+            if lease is None:
+                return None
+            with lease:
+                frame = self.preprocessor.preprocess(lease.frame)
+                if np.may_share_memory(frame, lease.frame):
+                    # no stage produced a new image; don't hand out the buffer
+                    frame = frame.copy()
+                return self._wrap(frame)
+        if wait_new:
+            frame, self.last_seq = self.source.wait_for_frame(self.last_seq, timeout)
+        else:
+            self.last_seq = self.source.frame_seq
+            frame = self.source.read_frame()
+        if frame is not None:
+            self._record_delivery(self.last_seq)
+        return self._wrap(frame)
+
+    def lease_frame(self, wait_new=False, timeout=None):
+        """
+        Borrow the latest frame without copying it. When the stream was
+        created with `buffers`, the frame lives in a reusable buffer that
+        the capture thread won't overwrite until the lease is released.
+
+        :param wait_new: If True, block until a frame newer than the last one
+                         read is available
+        :param timeout: Optional, maximum seconds to wait when wait_new is True
+        :return: FrameLease with a read-only `frame`, or None if no frame is
+                 available; call release() or use it in a `with` block
+        """
+        if not self.source.running:
+            self.source.start()
+        after_seq = self.last_seq if wait_new else -1
+        lease = self.source.lease_frame(after_seq, timeout)
+        if lease is not None:
+            self.last_seq = lease.seq
+            self._record_delivery(lease.seq)
+        return lease
+
+    def stats(self):
+        """
+        Capture and delivery statistics. Rates and frame ages cover the last
+        120 frames; counts are totals since the stream was created.
+
+        - capture_fps: rate at which the source is capturing frames
+        - delivered_fps: rate at which frames are being handed out
+        - captured, delivered: total frames captured and handed out
+        - duplicates: reads that returned a frame already handed out
+        - dropped: frames captured but skipped over between two reads
+        - age_p50, age_p95, age_p99, age_max: seconds from capture until
+          a frame was handed out
+
+        :return: Dictionary of the above, with None for anything not yet measurable
+        """
+        stats = {
+            "capture_fps": self.source.capture_fps(),
+            "delivered_fps": None,
+            "captured": self.source.frame_seq,
+            "delivered": self.delivered,
+            "duplicates": self.duplicates,
+            "dropped": self.dropped,
+            "age_p50": None,
+            "age_p95": None,
+            "age_p99": None,
+            "age_max": None,
+        }
+        if len(self._delivery_times) > 1:
+            elapsed = self._delivery_times[0] - self._delivery_times[-1]
+            if elapsed > 0:
+                stats["delivered_fps"] = (len(self._delivery_times) - 1) / elapsed
+        if len(self._frame_ages) > 0:
+            ages = list(self._frame_ages)
+            stats["age_p50"], stats["age_p95"], stats["age_p99"] = \
+                np.percentile(ages, (50, 95, 99)).tolist()
+            stats["age_max"] = max(ages)
+        return stats
+
+    def frames(self, max_fps=None, drop="latest", timeout=None, queue_size=30):
+        """
+        Generator yielding each new frame exactly once, passed through the
+        Preprocessor if one is set. Ends when the stream is stopped, a file
+        source reaches its end or, if `timeout` is given, when no new frame
+        arrives in that many seconds.
+
+        :param max_fps: Optional, maximum rate at which frames are yielded;
+                        frames arriving faster than that are dropped
+        :param drop: "latest" skips ahead to the newest frame whenever the
+                     consumer falls behind; "queue" delivers every frame in
+                     order, buffering up to `queue_size` and dropping the oldest
+        :param timeout: Optional, maximum seconds to wait for each frame
+        :param queue_size: Number of frames buffered with drop="queue"
+        """
+        self._check_drop_policy(drop)
+        if not self.source.running:
+            self.source.start()
+        interval = 1. / max_fps if max_fps else 0.
+        next_time = 0.
+        if drop == "latest":
+            while True:
+                delay = next_time - time.monotonic()
+                if delay > 0:
+                    time.sleep(delay)
+                frame = self.read_frame(wait_new=True, timeout=timeout)
+                if frame is None:
+                    return
+                next_time = time.monotonic() + interval
+                yield frame
+        queue = _FrameQueue(queue_size, copy=self.source.uses_buffers)
+        self.source.add_listener(queue)
+        try:
+            while True:
+                item = queue.get(timeout)
+                if item is None:
+                    return
+                frame, self.last_seq, captured = item
+                if captured < next_time:
+                    continue
+                next_time = captured + interval
+                self._record_delivery(self.last_seq)
+                yield self._wrap(self._preprocess(frame))
+        finally:
+            self.source.remove_listener(queue)
+
+    async def aframes(self, max_fps=None, drop="latest", queue_size=30):
+        """
+        Asynchronous version of frames() for use with `async for`. Waiting
+        for frames never blocks the event loop, and a Preprocessor, if set,
+        runs in the loop's default executor. Ends when the stream is stopped
+        or a file source reaches its end, once any frames queued with
+        drop="queue" have been delivered.
+
+        :param max_fps: Optional, maximum rate at which frames are yielded
+        :param drop: "latest" or "queue", see frames()
+        :param queue_size: Number of frames buffered with drop="queue"
+        """
+        self._check_drop_policy(drop)
+        if not self.source.running:
+            self.source.start()
+        loop = asyncio.get_running_loop()
+        ready = asyncio.Event()
+
+        def notify(*args):
+            loop.call_soon_threadsafe(ready.set)
+
+        queue = None
+        listener = notify
+        if drop == "queue":
+            queue = listener = _FrameQueue(queue_size, copy=self.source.uses_buffers,
+                                           notify=notify)
+        interval = 1. / max_fps if max_fps else 0.
+        next_time = 0.
+        self.source.add_listener(listener)
+        try:
+            while True:
+                delay = next_time - time.monotonic()
+                if delay > 0:
+                    await asyncio.sleep(delay)
+                ready.clear()
+                ended = not self.source.running or self.source.finished
+                if queue is None:
+                    if ended:
+                        return
+                    frame, self.last_seq = self.source.wait_for_frame(self.last_seq, 0)
+                    captured = time.monotonic()
+                else:
+                    # frames still queued when the stream ends are delivered first
+                    item = queue.get(0)
+                    if item is None and ended:
+                        return
+                    frame, self.last_seq, captured = item or (None, self.last_seq, 0.)
+                if frame is None:
+                    await ready.wait()
+                    continue
+                if captured < next_time:
+                    continue
+                next_time = captured + interval
+                self._record_delivery(self.last_seq)
+                if self.preprocessor is not None:
+                    frame = await loop.run_in_executor(None, self._preprocess, frame)
+                yield self._wrap(frame)
+        finally:
+            self.source.remove_listener(listener)
+
+    def _record_delivery(self, seq):
+        """
+        Update the counts and windows reported by stats() for a frame being
+        handed out, and let the source know it was taken
+        """
+        self.source.frame_taken(seq)
+        now = time.monotonic()
+        if seq <= self._last_delivered:
+            self.duplicates += 1
+        else:
+            if self._last_delivered > 0:
+                self.dropped += seq - self._last_delivered - 1
+            self._last_delivered = seq
+        self.delivered += 1
+        self._delivery_times.push(now)
+        captured = self.source.capture_time(seq)
+        if captured is not None:
+            self._frame_ages.push(now - captured)
+
+    def _wrap(self, frame):
+        if self.frame_objects and frame is not None:
+            return Frame(frame, seq=self.last_seq)
+        return frame
+
+    def _preprocess(self, frame):
+        if self.preprocessor is not None:
+            return self.preprocessor.preprocess(frame)
+        return frame
+
+    @staticmethod
+    def _check_drop_policy(drop):
+        if drop not in drop_policies:
+            raise ValueError("drop must be one of {}".format(", ".join(drop_policies)))
+
+
+class _FrameQueue(object):
+    """
+    Source listener that buffers every published frame for drop="queue".
+    Frames are copied when the source reuses its buffers.
+    """
+    def __init__(self, maxlen, copy=False, notify=None):
+        self.frames = deque(maxlen=maxlen)
+        self.copy = copy
+        self.notify = notify
+        self.stopped = False
+        self._cond = threading.Condition()
+
+    def __call__(self, frame, seq):
+        with self._cond:
+            if frame is None:
+                self.stopped = True
+            else:
+                if self.copy:
+                    frame = frame.copy()
+                self.frames.append((frame, seq, time.monotonic()))
+            self._cond.notify_all()
+        if self.notify is not None:
+            self.notify()
+
+    def get(self, timeout=None):
+        """
+        :return: Tuple of frame, sequence number and capture time, or None
+                 if the source stopped or `timeout` elapsed
+        """
+        with self._cond:
+            self._cond.wait_for(lambda: self.frames or self.stopped, timeout)
+            if self.frames:
+                return self.frames.popleft()
+        return None
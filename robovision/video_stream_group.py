@@ -0,0 +1,157 @@
+"""
+Synchronized capture from several cameras at once. Each read triggers a
+grab() on every camera back-to-back, so the frames are exposed as close
+together in time as the hardware allows, then retrieve()s (decodes) them.
+
+Each camera has its own worker thread, so one slow or stalled camera
+doesn't hold up the others: if it misses the read's timeout its frame is
+None and it isn't triggered again until it has caught up.
+
+The group relies on cv2.VideoCapture's separate grab() and retrieve(), so
+it works with the sources OpenCV opens itself (webcams, video files and
+stream URLs), not robovision's picam, jetson or native ipcam sources.
+
+Examples:
+
+import robovision as rv
+
+group = rv.VideoStreamGroup(sources=[0, 1, "http://10.15.18.101/mjpg/video.mjpg"])
+group.start()
+while some_condition is True:
+    frames, timestamps, skew = group.read_frames()
+    # frames[0] and frames[1] were grabbed within `skew` seconds of each other
+group.stop()
+
+Author: Tim Poulsen
+Web site: https://timpoulsen.com
+Copyright 2018, Tim Poulsen, all rights reserved
+License: MIT
+"""
+import cv2
+import threading
+import time
+from collections import namedtuple
+
+GroupFrames = namedtuple("GroupFrames", "frames timestamps skew")
+
+
+class VideoStreamGroup:
+    def __init__(self, sources=(0,), timeout=0.5):
+        """
+        :param sources: List of webcam ids (ints), video file paths or stream
+                        URLs, anything cv2.VideoCapture accepts
+        :param timeout: Seconds to wait for the cameras on each read
+        """
+        self.sources = list(sources)
+        self.timeout = timeout
+        self.running = False
+        self.members = []
+
+    def start(self):
+        self.members = [_GroupMember(source) for source in self.sources]
+        self.running = True
+        for member in self.members:
+            member.start()
+
+    def stop(self):
+        """
+        Stop every camera, waiting up to `timeout` seconds for each. A camera
+        stalled in grab() is left to its (daemon) thread rather than released.
+        """
+        self.running = False
+        for member in self.members:
+            member.stop(self.timeout)
+
+    def read_frames(self):
+        """
+        Grab a frame from every camera as simultaneously as possible. Will
+        start the group if it's not running already.
+
+        :return: GroupFrames tuple of frames (None for any camera that missed
+                 the timeout), their monotonic grab timestamps, and the skew
+                 in seconds between the earliest and latest grab
+        """
+        if not self.running:
+            self.start()
+        triggered = [member for member in self.members if member.trigger()]
+        deadline = time.monotonic() + self.timeout
+        for member in triggered:
+            member.done.wait(max(deadline - time.monotonic(), 0))
+        frames = []
+        timestamps = []
+        for member in self.members:
+            frame, timestamp = member.collect() if member in triggered else (None, None)
+            frames.append(frame)
+            timestamps.append(timestamp)
+        grabbed = [t for t in timestamps if t is not None]
+        skew = max(grabbed) - min(grabbed) if grabbed else None
+        return GroupFrames(tuple(frames), tuple(timestamps), skew)
+
+
+class _GroupMember(object):
+    """
+    One camera of a VideoStreamGroup and the thread that grabs from it
+    """
+    def __init__(self, source):
+        self.source = source
+        self.frame = None
+        self.timestamp = None
+        self.running = False
+        self.busy = False
+        self.done = threading.Event()
+        self._go = threading.Event()
+
+    def start(self):
+        self.cam = cv2.VideoCapture(self.source)
+        self.ct = threading.Thread(target=self._capture_image_thread,
+                                   name="VideoStreamGroup-{}".format(self.source))
+        self.ct.daemon = True
+        self.running = True
+        self.ct.start()
+
+    def stop(self, timeout=None):
+        self.running = False
+        self._go.set()
+        self.ct.join(timeout)
+        if not self.ct.is_alive():
+            # releasing the camera while a grab is in progress isn't safe
+            self.cam.release()
+
+    def trigger(self):
+        """
+        Start a grab unless the previous one is still outstanding. A grab
+        that finished after its read timed out is stale and discarded.
+
+        :return: True if a grab was started
+        """
+        if self.busy and not self.done.is_set():
+            return False
+        self.busy = True
+        self.done.clear()
+        self._go.set()
+        return True
+
+    def collect(self):
+        """
+        :return: Tuple of frame and grab timestamp, or (None, None) if the
+                 grab hasn't finished
+        """
+        if not self.done.is_set():
+            return None, None
+        self.busy = False
+        return self.frame, self.timestamp
+
+    def _capture_image_thread(self):
+        while True:
+            self._go.wait()
+            self._go.clear()
+            if self.running is False:
+                break
+            frame = timestamp = None
+            if self.cam.grab():
+                timestamp = time.monotonic()
+                success, frame = self.cam.retrieve()
+                if not success:
+                    frame = timestamp = None
+            self.frame, self.timestamp = frame, timestamp
+            self.done.set()
@@ -0,0 +1,108 @@
+"""
+pylint tests, run from main robovision directory with `pytest`
+"""
+import cv2
+import numpy as np
+import os
+import pickle
+import pytest
+import sys
+from os import path
+sys.path.append(path.dirname(path.dirname(path.abspath(__file__))))
+from robovision import robovision as rv
+from robovision.robovision import camera_params
+
+kitten = cv2.imread('tests/kitten.jpg')
+h, w = kitten.shape[:2]
+cam_matrix = np.array([[w, 0., w / 2.], [0., w, h / 2.], [0., 0., 1.]])
+dist_coeff = np.array([[-0.3, 0.1, 0.001, 0.001, 0.]])
+
+
+class Object(object):
+    pass
+
+
+class Exploit(object):
+    def __init__(self, target):
+        self.target = target
+
+    def __reduce__(self):
+        # unpickling would write a file with a numpy function
+        return np.savetxt, (self.target, np.zeros(1))
+
+
+def test_npz_with_maps_is_memory_mapped(tmp_path):
+    filename = rv.save_camera_params(str(tmp_path / "params.npz"), cam_matrix, dist_coeff,
+                                     (w, h), include_maps=True)
+    params = rv.load_camera_params(filename)
+    assert isinstance(params.maps[0], np.memmap)
+    assert (params.mtx == cam_matrix).all() and params.img_size == (w, h)
+    assert rv.load_camera_params(filename) is params
+    expected = rv.Undistorter(cam_matrix, dist_coeff).undistort(kitten)
+    assert (rv.flatten(kitten, params) == expected).all()
+    assert params.undistorter().maps((w, h))[0] is params.maps[0]
+
+
+def test_cache_is_bounded(tmp_path):
+    filename = rv.save_camera_params(str(tmp_path / "params.npz"), cam_matrix, dist_coeff)
+    params = rv.load_camera_params(filename)
+    # saved again: the new file replaces the cached one
+    os.utime(filename, (0, 0))
+    reloaded = rv.load_camera_params(filename)
+    assert reloaded is not params
+    assert len([key for key in camera_params._cache if key[0] == filename]) == 1
+    for i in range(camera_params._cache_size + 2):
+        rv.load_camera_params(rv.save_camera_params(str(tmp_path / "{}.npz".format(i)),
+                                                    cam_matrix, dist_coeff))
+    assert len(camera_params._cache) == camera_params._cache_size
+
+
+def test_npz_without_mmap(tmp_path):
+    filename = rv.save_camera_params(str(tmp_path / "params.npz"), cam_matrix, dist_coeff)
+    params = rv.load_camera_params(filename, mmap=False)
+    assert params.maps is None and params.img_size is None
+    assert (params.dist == dist_coeff).all()
+
+
+def test_json_round_trip(tmp_path):
+    filename = rv.save_camera_params(str(tmp_path / "params.json"), cam_matrix, dist_coeff, (w, h))
+    params = rv.load_camera_params(filename)
+    assert np.allclose(params.mtx, cam_matrix) and np.allclose(params.dist.ravel(), dist_coeff)
+    assert params.img_size == (w, h)
+
+
+def test_convert_legacy_pickle(tmp_path):
+    legacy = Object()
+    legacy.mtx, legacy.dist, legacy.img_size = cam_matrix, dist_coeff, (w, h)
+    filename = str(tmp_path / "params.pickle")
+    with open(filename, "wb") as f:
+        pickle.dump(legacy, f)
+    # loads without this test module's Object class being involved
+    assert (rv.load_camera_params(filename).mtx == cam_matrix).all()
+    converted = rv.convert_camera_params(filename)
+    assert converted.endswith("params.npz")
+    assert rv.load_camera_params(converted).maps is not None
+
+
+def test_legacy_pickle_protocols(tmp_path):
+    legacy = Object()
+    legacy.mtx, legacy.dist = cam_matrix, dist_coeff
+    for protocol in range(pickle.HIGHEST_PROTOCOL + 1):
+        filename = str(tmp_path / "params{}.pickle".format(protocol))
+        with open(filename, "wb") as f:
+            pickle.dump(legacy, f, protocol=protocol)
+        assert (rv.load_camera_params(filename).dist == dist_coeff).all()
+
+
+def test_legacy_pickle_cannot_run_code(tmp_path):
+    legacy = Object()
+    target = str(tmp_path / "written.txt")
+    legacy.mtx, legacy.dist = Exploit(target), dist_coeff
+    filename = str(tmp_path / "params.pickle")
+    with open(filename, "wb") as f:
+        pickle.dump(legacy, f)
+    with pytest.raises(pickle.UnpicklingError):
+        rv.load_camera_params(filename)
+    with pytest.raises(pickle.UnpicklingError):
+        rv.convert_camera_params(filename)
+    assert not path.exists(target)
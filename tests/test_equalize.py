@@ -0,0 +1,56 @@
+"""
+pylint tests, run from main robovision directory with `pytest`
+"""
+import cv2
+import sys
+import threading
+from os import path
+sys.path.append(path.dirname(path.dirname(path.abspath(__file__))))
+from robovision import robovision as rv
+from robovision.robovision.core import equalize, get_clahe
+
+kitten = cv2.imread('tests/kitten.jpg')
+h, w = kitten.shape[:2]
+
+
+def split_merge_equalize(image):
+    clahe = cv2.createCLAHE(clipLimit=2.0, tileGridSize=(8, 8))
+    lab_planes = list(cv2.split(cv2.cvtColor(image, cv2.COLOR_BGR2LAB)))
+    lab_planes[0] = clahe.apply(lab_planes[0])
+    return cv2.cvtColor(cv2.merge(lab_planes), cv2.COLOR_LAB2BGR)
+
+
+def test_equalize_color_image():
+    assert (equalize(kitten) == split_merge_equalize(kitten)).all()
+
+
+def test_equalize_grayscale_and_luminance_only():
+    gray = cv2.cvtColor(kitten, cv2.COLOR_BGR2GRAY)
+    assert (equalize(gray) == get_clahe().apply(gray)).all()
+    lightness = equalize(kitten, luminance_only=True)
+    assert lightness.shape == (h, w)
+    expected = get_clahe().apply(cv2.cvtColor(kitten, cv2.COLOR_BGR2LAB)[:, :, 0].copy())
+    assert (lightness == expected).all()
+
+
+def test_equalize_downscaled():
+    assert equalize(kitten, scale=2).shape == (h // 2, w // 2, 3)
+    frame = rv.Frame(kitten)
+    assert equalize(frame, scale=2).shape == (h // 2, w // 2, 3)
+
+
+def test_equalize_frame_leaves_cache_unchanged():
+    frame = rv.Frame(kitten)
+    lab = frame.lab.copy()
+    assert (equalize(frame) == split_merge_equalize(kitten)).all()
+    assert (frame.lab == lab).all()
+
+
+def test_clahe_instances_are_per_thread_and_settings():
+    assert get_clahe() is get_clahe(2, (8, 8))
+    assert get_clahe(3.) is not get_clahe()
+    other = []
+    thread = threading.Thread(target=lambda: other.append(get_clahe()))
+    thread.start()
+    thread.join()
+    assert other[0] is not get_clahe()
@@ -0,0 +1,86 @@
+"""
+pylint tests, run from main robovision directory with `pytest`
+"""
+import asyncio
+import cv2
+import sys
+import time
+from os import path
+sys.path.append(path.dirname(path.dirname(path.abspath(__file__))))
+from robovision import robovision as rv
+
+kitten = cv2.imread('tests/kitten.jpg')
+
+
+def make_video(filename, count=10, fps=30):
+    h, w = kitten.shape[:2]
+    writer = cv2.VideoWriter(filename, cv2.VideoWriter_fourcc(*"MJPG"), fps, (w, h))
+    for _ in range(count):
+        writer.write(kitten)
+    writer.release()
+    return filename
+
+
+def test_throughput_replay_delivers_every_frame(tmp_path):
+    video = make_video(str(tmp_path / "kitten.avi"))
+    vs = rv.VideoStream(source="file", file_path=video)
+    seqs = []
+    for frame in vs.frames(timeout=2):
+        assert frame.shape == kitten.shape
+        seqs.append(vs.last_seq)
+    vs.stop()
+    assert seqs == list(range(1, 11))
+
+
+def test_image_directory_replay(tmp_path):
+    for i in range(3):
+        cv2.imwrite(str(tmp_path / "{:03d}.png".format(i)), kitten)
+    vs = rv.VideoStream(source="file", file_path=str(tmp_path))
+    frames = list(vs.frames(timeout=2))
+    vs.stop()
+    assert len(frames) == 3
+
+
+def test_image_directory_skips_unreadable_images(tmp_path):
+    for i in range(3):
+        cv2.imwrite(str(tmp_path / "{:03d}.png".format(i)), kitten)
+    with open(str(tmp_path / "001a.png"), "wb") as f:
+        f.write(b"not an image")
+    vs = rv.VideoStream(source="file", file_path=str(tmp_path))
+    frames = list(vs.frames(timeout=2))
+    vs.stop()
+    assert len(frames) == 3
+
+
+def test_realtime_replay_drops_frames(tmp_path):
+    video = make_video(str(tmp_path / "kitten.avi"), count=20, fps=100)
+    vs = rv.VideoStream(source="file", file_path=video, realtime=True)
+    started = time.monotonic()
+    frames = []
+    for frame in vs.frames(timeout=2):
+        frames.append(frame)
+        time.sleep(0.03)
+    elapsed = time.monotonic() - started
+    vs.stop()
+    assert len(frames) < 20
+    assert elapsed < 1
+
+
+def test_aframes_queue_drains_after_the_end(tmp_path):
+    for i in range(20):
+        cv2.imwrite(str(tmp_path / "{:03d}.jpg".format(i)), kitten)
+    vs = rv.VideoStream(source="file", file_path=str(tmp_path), realtime=True, fps=30)
+
+    async def consume():
+        seqs = []
+        async for frame in vs.aframes(drop="queue"):
+            seqs.append(vs.last_seq)
+            # a slow consumer, so the file ends with frames still queued
+            await asyncio.sleep(0.06)
+        return seqs
+
+    seqs = asyncio.run(asyncio.wait_for(consume(), 5))
+    vs.stop()
+    # every frame published is delivered, including those queued at the end
+    assert seqs == list(range(1, vs.source.frame_seq + 1))
+    assert len(seqs) > 12
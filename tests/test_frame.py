@@ -0,0 +1,72 @@
+"""
+pylint tests, run from main robovision directory with `pytest`
+"""
+import cv2
+import numpy as np
+import sys
+from os import path
+from unittest.mock import patch
+sys.path.append(path.dirname(path.dirname(path.abspath(__file__))))
+from robovision import robovision as rv
+
+kitten = cv2.imread('tests/kitten.jpg')
+
+
+def test_derived_images_are_computed_once():
+    frame = rv.Frame(kitten, seq=3)
+    assert frame.hsv is frame.hsv
+    assert (frame.hsv == cv2.cvtColor(kitten, cv2.COLOR_BGR2HSV)).all()
+    assert (frame.gray == cv2.cvtColor(kitten, cv2.COLOR_BGR2GRAY)).all()
+    assert frame.lab.shape == kitten.shape
+    assert frame.seq == 3
+
+
+def test_frame_shares_the_image_data():
+    frame = rv.Frame(kitten)
+    assert np.may_share_memory(frame, kitten)
+    assert type(frame.image) is np.ndarray
+
+
+def test_resized_frames_have_their_own_cache():
+    frame = rv.Frame(kitten, seq=5)
+    small = frame.resized(width=100)
+    assert small is frame.resized(width=100)
+    assert isinstance(small, rv.Frame)
+    assert small.shape[1] == 100 and small.seq == 5
+    assert small.hsv.shape[1] == 100
+
+
+def test_copies_start_with_an_empty_cache():
+    frame = rv.Frame(kitten)
+    frame.hsv
+    assert not frame.copy()._derived
+    assert not frame[10:20]._derived
+
+
+def test_non_image_results_are_plain_arrays():
+    frame = rv.Frame(kitten)
+    assert type(frame.mean()) is np.float64
+    assert type(frame.sum(axis=2)) is np.ndarray
+    mask = frame > 100
+    assert type(mask) is np.ndarray and mask.dtype == np.bool_
+    assert type(frame[10:20]) is rv.Frame
+
+
+def test_detectors_share_one_conversion():
+    frame = rv.Frame(kitten)
+    target = rv.Target()
+    target.set_color_range(lower=(0, 0, 0), upper=(180, 255, 100))
+    with patch("cv2.cvtColor", wraps=cv2.cvtColor) as cvt:
+        first = target.get_contours(frame)
+        second = target.get_contours(frame)
+    assert cvt.call_count == 1
+    assert len(first) == len(second)
+
+
+def test_video_stream_delivers_frames(tmp_path):
+    for i in range(2):
+        cv2.imwrite(str(tmp_path / "{:03d}.png".format(i)), kitten)
+    vs = rv.VideoStream(source="file", file_path=str(tmp_path), frame_objects=True)
+    frames = list(vs.frames(timeout=2))
+    vs.stop()
+    assert [frame.seq for frame in frames] == [1, 2]
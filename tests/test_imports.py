@@ -0,0 +1,74 @@
+"""
+pylint tests, run from main robovision directory with `pytest`
+"""
+import json
+import os
+import pytest
+import subprocess
+import sys
+from os import path
+sys.path.append(path.dirname(path.dirname(path.abspath(__file__))))
+from robovision import robovision as rv
+
+# A cold `import robovision` may take at most this fraction of the time a
+# cold `import cv2` takes on the same machine
+import_budget = 0.25
+heavy_modules = ["cv2", "numpy", "robovision.robovision.core", "robovision.robovision.video_stream",
+                 "robovision.robovision.preprocessor", "robovision.robovision.target"]
+
+
+def run_fresh(code):
+    # a new interpreter, run from the directory these tests found robovision in
+    root = path.dirname(path.dirname(path.abspath(sys.modules["robovision"].__file__)))
+    env = dict(os.environ, PYTHONPATH=root)
+    out = subprocess.check_output([sys.executable, "-c", code], cwd=root, env=env)
+    return json.loads(out.decode())
+
+
+def cold_import(module="robovision.robovision"):
+    return run_fresh(
+        "import json, sys, time\n"
+        "start = time.perf_counter()\n"
+        "import " + module + "\n"
+        "elapsed = time.perf_counter() - start\n"
+        "print(json.dumps({'elapsed': elapsed, 'modules': sorted(sys.modules)}))\n")
+
+
+def test_import_loads_nothing_heavy():
+    result = cold_import()
+    assert [name for name in heavy_modules if name in result["modules"]] == []
+
+
+def test_import_time_budget():
+    # relative to OpenCV's import, so a slow or busy machine slows both;
+    # best of a few of each to ride out noise
+    elapsed = min(cold_import()["elapsed"] for _ in range(3))
+    opencv = min(cold_import("cv2")["elapsed"] for _ in range(3))
+    assert elapsed < opencv * import_budget
+
+
+def test_names_load_their_module_on_first_use():
+    result = run_fresh(
+        "import json, sys\n"
+        "import robovision.robovision as rv\n"
+        "resize = rv.resize\n"
+        "loaded = {'core': 'robovision.robovision.core' in sys.modules,\n"
+        "          'video_stream': 'robovision.robovision.video_stream' in sys.modules,\n"
+        "          'same': rv.resize is resize and 'resize' in vars(rv)}\n"
+        "print(json.dumps(loaded))\n")
+    assert result == {"core": True, "video_stream": False, "same": True}
+
+
+def test_public_names():
+    from robovision.robovision import core, point_ops, target
+    assert rv.resize is core.resize
+    assert rv.Target is target.Target
+    assert rv.point_ops is point_ops
+    assert set(rv.__all__) <= set(dir(rv))
+    for name in rv.__all__:
+        assert getattr(rv, name) is not None
+
+
+def test_unknown_name():
+    with pytest.raises(AttributeError, match="not_a_function"):
+        rv.not_a_function
@@ -0,0 +1,116 @@
+"""
+pylint tests, run from main robovision directory with `pytest`
+"""
+import cv2
+import sys
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from os import path
+sys.path.append(path.dirname(path.dirname(path.abspath(__file__))))
+from robovision import robovision as rv
+
+kitten = cv2.imread('tests/kitten.jpg')
+_, kitten_jpeg = cv2.imencode('.jpg', kitten)
+kitten_jpeg = kitten_jpeg.tobytes()
+
+
+class MJPEGHandler(BaseHTTPRequestHandler):
+    """
+    Stand-in IP camera; closes the connection after `frames` frames
+    """
+    frames = 1000
+    content_length = True
+
+    def do_GET(self):
+        self.send_response(200)
+        self.send_header("Content-Type", "multipart/x-mixed-replace; boundary=myboundary")
+        self.end_headers()
+        try:
+            for _ in range(self.frames):
+                self.wfile.write(b"--myboundary\r\nContent-Type: image/jpeg\r\n")
+                if self.content_length:
+                    self.wfile.write("Content-Length: {}\r\n".format(len(kitten_jpeg)).encode())
+                self.wfile.write(b"\r\n" + kitten_jpeg + b"\r\n")
+                time.sleep(0.01)
+        except (BrokenPipeError, ConnectionResetError):
+            pass
+
+    def log_message(self, *args):
+        pass
+
+
+def serve(**attrs):
+    handler = type("Handler", (MJPEGHandler,), attrs)
+    server = ThreadingHTTPServer(("127.0.0.1", 0), handler)
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server, "http://127.0.0.1:{}/mjpg/video.mjpg".format(server.server_address[1])
+
+
+def test_native_ipcam_decodes_frames():
+    server, url = serve()
+    vs = rv.VideoStream(source="ipcam", ipcam_url=url, ipcam_native=True)
+    frame = vs.read_frame(wait_new=True, timeout=2)
+    vs.stop()
+    server.shutdown()
+    assert frame.shape == kitten.shape
+
+
+def test_native_ipcam_without_content_length():
+    server, url = serve(content_length=False)
+    vs = rv.VideoStream(source="ipcam", ipcam_url=url, ipcam_native=True)
+    frame = vs.read_frame(wait_new=True, timeout=2)
+    vs.stop()
+    server.shutdown()
+    assert frame.shape == kitten.shape
+
+
+def test_native_ipcam_reconnects():
+    server, url = serve(frames=3)
+    vs = rv.VideoStream(source="ipcam", ipcam_url=url, ipcam_native=True)
+    vs.start()
+    deadline = time.monotonic() + 3
+    while vs.source.reader.seq <= 6 and time.monotonic() < deadline:
+        time.sleep(0.01)
+    reconnects = vs.source.reader.reconnects
+    vs.stop()
+    server.shutdown()
+    assert reconnects >= 2
+
+
+def test_native_ipcam_records_connection_errors():
+    # nothing listens on port 1, so every attempt is refused
+    vs = rv.VideoStream(source="ipcam", ipcam_url="http://127.0.0.1:1/mjpg/video.mjpg",
+                        ipcam_native=True)
+    vs.start()
+    deadline = time.monotonic() + 2
+    while vs.source.reader.last_error is None and time.monotonic() < deadline:
+        time.sleep(0.01)
+    error = vs.source.reader.last_error
+    vs.stop()
+    assert isinstance(error, ConnectionRefusedError)
+
+
+def test_lazy_reduced_grayscale_decode():
+    server, url = serve()
+    vs = rv.VideoStream(source="ipcam", ipcam_url=url, lazy_decode=True,
+                        decode_scale=2, grayscale=True)
+    frame = vs.read_frame(wait_new=True, timeout=2)
+    assert isinstance(vs.source.current_frame, bytes)
+    vs.stop()
+    server.shutdown()
+    h, w = kitten.shape[:2]
+    assert frame.shape == ((h + 1) // 2, (w + 1) // 2)
+
+
+def test_lazy_decode_is_shared_between_reads():
+    server, url = serve()
+    vs = rv.VideoStream(source="ipcam", ipcam_url=url, lazy_decode=True)
+    vs.start()
+    lease = vs.lease_frame(wait_new=True, timeout=2)
+    vs.stop()
+    server.shutdown()
+    jpeg = vs.source.current_frame
+    assert vs.source._decode(jpeg) is vs.source._decode(jpeg)
+    assert lease.frame.shape == kitten.shape
@@ -0,0 +1,78 @@
+"""
+pylint tests, run from main robovision directory with `pytest`
+"""
+import cv2
+import json
+import numpy as np
+import pytest
+import sys
+from os import path
+sys.path.append(path.dirname(path.dirname(path.abspath(__file__))))
+from robovision import robovision as rv
+
+kitten = cv2.imread('tests/kitten.jpg')
+spec = {
+    "preprocessor": {
+        "optimize": True,
+        "stages": [
+            {"func": "resize", "kwargs": {"width": 160}},
+            {"func": "cv2.GaussianBlur", "args": [[5, 5], 0], "dst": True},
+        ]
+    },
+    "target": {
+        "lower": [0, 0, 0],
+        "upper": [180, 255, 100],
+        "track": True,
+        "sort_method": "area",
+    }
+}
+
+
+def test_load_pipeline_from_json(tmp_path):
+    filename = str(tmp_path / "pipeline.json")
+    with open(filename, "w") as f:
+        json.dump(spec, f)
+    pipeline = rv.load_pipeline(filename)
+    assert len(pipeline.preprocessor.processors) == 2
+    assert pipeline.preprocessor.processors[1].args == ((5, 5), 0)
+    assert pipeline.target.track is True
+    contours = pipeline.process(kitten)
+    areas = [cv2.contourArea(c) for c in contours]
+    assert areas == sorted(areas, reverse=True)
+
+
+def test_load_pipeline_from_yaml(tmp_path):
+    yaml = pytest.importorskip("yaml")
+    filename = str(tmp_path / "pipeline.yaml")
+    with open(filename, "w") as f:
+        yaml.safe_dump({"preprocessor": {"stages": [
+            {"func": "cv2.cvtColor", "args": ["cv2.COLOR_BGR2GRAY"]}]}}, f)
+    pipeline = rv.load_pipeline(filename)
+    assert pipeline.process(kitten).ndim == 2
+
+
+@pytest.mark.parametrize("bad", [
+    {"preprocesor": {}},
+    {"preprocessor": {"stages": [{"func": "no_such_function"}]}},
+    {"preprocessor": {"stages": [{"func": "get_video_stream"}]}},
+    {"preprocessor": {"stages": [{"func": "load_camera_params"}]}},
+    {"preprocessor": {"stages": [{"func": "resize", "kwargs": {"depth": 3}}]}},
+    {"preprocessor": {"stages": [{"func": "cv2.cvtColor", "args": ["cv2.NO_SUCH_CODE"]}]}},
+    {"preprocessor": {"roi": [0, 0, -1, 10]}},
+    {"target": {"lower": [0, 0]}},
+    {"target": {"sort_method": "biggest"}},
+    {"target": {"track": "yes"}},
+])
+def test_invalid_specs_fail_at_load(bad):
+    with pytest.raises(ValueError):
+        rv.load_pipeline(bad)
+
+
+def test_warm_up_leaves_no_state_behind():
+    pipeline = rv.load_pipeline(spec)
+    pipeline.preprocessor.profile = True
+    pipeline.warm_up((320, 240))
+    assert pipeline.target.roi is None
+    assert pipeline.preprocessor.profile_stats()[-1]["count"] == 0
+    assert np.may_share_memory(pipeline.preprocessor._plan[1](np.zeros((120, 160, 3), np.uint8)),
+                               pipeline.preprocessor._plan[1](np.zeros((120, 160, 3), np.uint8)))
@@ -0,0 +1,53 @@
+"""
+pylint tests, run from main robovision directory with `pytest`
+"""
+import cv2
+import numpy as np
+import pytest
+import sys
+from os import path
+sys.path.append(path.dirname(path.dirname(path.abspath(__file__))))
+from robovision import robovision as rv
+
+kitten = cv2.imread('tests/kitten.jpg')
+point_ops = rv.point_ops
+
+
+@pytest.mark.parametrize("brightness, contrast", [(0, 0), (25, 0), (0, -30), (-12.5, 47.3), (80, 80)])
+def test_brightness_contrast_matches_add_weighted(brightness, contrast):
+    expected = cv2.addWeighted(kitten, 1 + contrast / 100., kitten, 0, brightness)
+    assert (rv.adjust_brightness_contrast(kitten, brightness, contrast) == expected).all()
+
+
+def test_float_images_still_adjusted():
+    image = kitten.astype(np.float32)
+    assert rv.adjust_brightness(image, 10.)[0, 0, 0] == image[0, 0, 0] + 10
+
+
+def test_tables_are_cached_and_read_only():
+    lut = point_ops.gamma_lut(2.)
+    assert lut is point_ops.gamma_lut(2.)
+    assert not lut.flags.writeable
+    assert lut[0] == 0 and lut[255] == 255 and lut[64] > 64
+
+
+def test_curve_interpolates_between_points():
+    lut = point_ops.curve_lut([(0, 0), (100, 50), (255, 255)])
+    assert lut[50] == 25 and lut[100] == 50 and lut[255] == 255
+
+
+def test_compose_applies_tables_in_order():
+    first = point_ops.brightness_contrast_lut(20, 0)
+    second = point_ops.gamma_lut(0.5)
+    lut = point_ops.compose(first, second)
+    expected = rv.adjust_gamma(rv.adjust_brightness(kitten, 20), 0.5)
+    assert (point_ops.apply_lut(kitten, lut) == expected).all()
+
+
+def test_per_channel_tables():
+    invert = 255 - np.arange(256, dtype=np.uint8)
+    identity = np.arange(256, dtype=np.uint8)
+    lut = point_ops.per_channel(invert, identity, identity)
+    image = point_ops.apply_lut(kitten, point_ops.compose(lut, point_ops.gamma_lut(1.)))
+    assert (image[:, :, 0] == 255 - kitten[:, :, 0]).all()
+    assert (image[:, :, 1:] == kitten[:, :, 1:]).all()
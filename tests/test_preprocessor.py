@@ -2,6 +2,7 @@
 pylint tests, run from main robovision directory with `pytest`
 """
 import cv2
+import numpy as np
 import sys
 from os import path
 from unittest.mock import MagicMock
@@ -38,3 +39,181 @@ def test_preprocessor():
     foo.assert_called
     h, w = img.shape[:2]
     assert h == 100
+
+
+def test_compiled_stages_receive_bound_arguments():
+    p = rv.Preprocessor()
+    p.add_processor(rv.resize, kwargs={"width": 50})
+    p.add_processor(rv.adjust_brightness, args=(10.,))
+    img = p.preprocess(kitten)
+    assert img.shape[1] == 50
+    assert p._copy_input is False
+
+
+def test_input_copied_for_in_place_first_stage():
+    p = rv.Preprocessor()
+    p.add_processor(cv2.rectangle, args=((0, 0), (10, 10), (0, 0, 255), -1), in_place=True)
+    original = kitten.copy()
+    img = p.preprocess(kitten)
+    assert (kitten == original).all()
+    assert (img[5, 5] == (0, 0, 255)).all()
+
+
+def test_input_copied_for_unflagged_stage():
+    def fill(image):
+        image[:10, :10] = 255
+        return image
+
+    p = rv.Preprocessor()
+    p.add_processor(rv.resize, kwargs={"width": None})
+    p.add_processor(fill)
+    original = kitten.copy()
+    img = p.preprocess(kitten)
+    assert (kitten == original).all()
+    assert (img[:10, :10] == 255).all()
+    assert p.explain().splitlines()[0] == "1. copy input"
+
+
+def test_dst_buffer_is_reused():
+    p = rv.Preprocessor()
+    p.add_processor(cv2.GaussianBlur, args=((5, 5), 0), dst=True)
+    first = p.preprocess(kitten)
+    second = p.preprocess(kitten)
+    assert first is second
+
+
+def test_optimized_plan_fuses_brightness_and_contrast():
+    plain = rv.Preprocessor()
+    fused = rv.Preprocessor(optimize=True)
+    for p in (plain, fused):
+        p.add_processor(rv.adjust_brightness, args=(25.,))
+        p.add_processor(rv.adjust_contrast, kwargs={"contrast": 30.})
+        p.add_processor(rv.adjust_brightness_contrast, args=(-12., -7.5))
+    assert (plain.preprocess(kitten) == fused.preprocess(kitten)).all()
+    assert fused.explain().count("lookup table") == 1
+    assert len(fused.explain().splitlines()) == 1
+
+
+def test_optimized_plan_resizes_first():
+    p = rv.Preprocessor(optimize=True)
+    p.add_processor(rv.adjust_brightness, args=(10.,))
+    p.add_processor(cv2.cvtColor, args=(cv2.COLOR_BGR2HSV,))
+    p.add_processor(rv.resize, kwargs={"width": 50})
+    steps = p.explain().splitlines()
+    assert "resize" in steps[0]
+    assert p.preprocess(kitten).shape[1] == 50
+
+
+def test_optimized_plan_drops_color_round_trips():
+    p = rv.Preprocessor(optimize=True)
+    p.add_processor(cv2.cvtColor, args=(cv2.COLOR_BGR2HSV,))
+    p.add_processor(cv2.cvtColor, kwargs={"code": cv2.COLOR_HSV2BGR})
+    p.add_processor(cv2.cvtColor, args=(cv2.COLOR_BGR2GRAY,))
+    assert len(p.explain().splitlines()) == 1
+    assert p.preprocess(kitten).shape == (h, w)
+
+
+def test_profile_records_each_step():
+    p = rv.Preprocessor(profile=True)
+    p.add_processor(rv.resize, kwargs={"width": 50})
+    p.add_processor(cv2.GaussianBlur, args=((5, 5), 0), in_place=False)
+    for _ in range(5):
+        p.preprocess(kitten)
+    stats = p.profile_stats()
+    assert [row["name"] for row in stats][-1] == "total"
+    assert len(stats) == 3
+    assert all(row["count"] == 5 for row in stats)
+    assert stats[-1]["max"] >= stats[0]["p50"]
+    assert "GaussianBlur" in p.report()
+
+
+def test_profile_off_records_nothing():
+    p = rv.Preprocessor()
+    p.add_processor(rv.resize, kwargs={"width": 50})
+    p.preprocess(kitten)
+    assert all(row["count"] == 0 and row["mean"] is None for row in p.profile_stats())
+
+
+def test_profile_through_video_stream(tmp_path):
+    for i in range(3):
+        cv2.imwrite(str(tmp_path / "{:03d}.png".format(i)), kitten)
+    p = rv.Preprocessor(profile=True)
+    p.add_processor(rv.resize, kwargs={"width": 50})
+    vs = rv.VideoStream(source="file", file_path=str(tmp_path))
+    vs.add_preprocessor(p)
+    frames = list(vs.frames(timeout=2))
+    vs.stop()
+    assert len(frames) == 3
+    assert p.profile_stats()[-1]["count"] == 3
+
+
+def test_pipeline_matches_serial_processing():
+    p = rv.Preprocessor()
+    p.add_processor(rv.resize, kwargs={"width": 100})
+    p.add_processor(cv2.GaussianBlur, args=((5, 5), 0), dst=True)
+    p.add_processor(cv2.cvtColor, args=(cv2.COLOR_BGR2GRAY,))
+    images = [rv.adjust_brightness(kitten, i * 10.) for i in range(8)]
+    expected = [p.preprocess(image) for image in images]
+    for threads in (None, 2):
+        results = list(p.pipeline(images, threads=threads))
+        assert len(results) == len(expected)
+        assert all((a == b).all() for a, b in zip(results, expected))
+
+
+def test_pipeline_raises_stage_errors():
+    p = rv.Preprocessor()
+    p.add_processor(MagicMock(side_effect=ValueError("bad frame")))
+    try:
+        list(p.pipeline([kitten, kitten]))
+    except ValueError as e:
+        assert str(e) == "bad frame"
+    else:
+        assert False, "error was not raised"
+
+
+def test_pipeline_stops_when_consumer_does():
+    p = rv.Preprocessor()
+    p.add_processor(rv.resize, kwargs={"width": 50})
+
+    def forever():
+        while True:
+            yield kitten
+    results = p.pipeline(forever())
+    assert next(results).shape[1] == 50
+    results.close()
+
+
+def test_preprocess_batch_preserves_order():
+    p = rv.Preprocessor()
+    p.add_processor(rv.resize, kwargs={"width": 60})
+    p.add_processor(cv2.GaussianBlur, args=((5, 5), 0))
+    images = [rv.adjust_brightness(kitten, i * 5.) for i in range(10)]
+    expected = [p.preprocess(image) for image in images]
+    results = list(p.preprocess_batch(images, workers=2, chunksize=3))
+    assert len(results) == 10
+    assert all((a == b).all() for a, b in zip(results, expected))
+
+
+def test_preprocess_batch_directories(tmp_path):
+    source, output = tmp_path / "in", tmp_path / "out"
+    source.mkdir()
+    for i in range(4):
+        cv2.imwrite(str(source / "{:03d}.png".format(i)), kitten)
+    p = rv.Preprocessor()
+    p.add_processor(cv2.cvtColor, args=(cv2.COLOR_BGR2GRAY,))
+    for workers in (0, 2):
+        paths = list(p.preprocess_batch(str(source), workers=workers, output_dir=str(output)))
+        assert [path.basename(p) for p in paths] == ["000.png", "001.png", "002.png", "003.png"]
+        assert cv2.imread(paths[0], cv2.IMREAD_UNCHANGED).shape == (h, w)
+
+
+def test_optimized_plan_fuses_gamma_and_tables():
+    invert = 255 - np.arange(256, dtype=np.uint8)
+    plain = rv.Preprocessor()
+    fused = rv.Preprocessor(optimize=True)
+    for p in (plain, fused):
+        p.add_processor(rv.adjust_gamma, args=(1.8,))
+        p.add_processor(rv.point_ops.apply_lut, args=(invert,))
+        p.add_processor(rv.adjust_contrast, args=(20.,))
+    assert (plain.preprocess(kitten) == fused.preprocess(kitten)).all()
+    assert len(fused.explain().splitlines()) == 1
@@ -0,0 +1,50 @@
+"""
+pylint tests, run from main robovision directory with `pytest`
+"""
+import cv2
+import numpy as np
+import sys
+from os import path
+from unittest.mock import patch
+sys.path.append(path.dirname(path.dirname(path.abspath(__file__))))
+from robovision import robovision as rv
+
+kitten = cv2.imread('tests/kitten.jpg')
+h, w = kitten.shape[:2]
+
+
+def test_sizes_are_made_once_from_the_nearest_larger():
+    pyramid = rv.Pyramid(kitten)
+    with patch("cv2.resize", wraps=cv2.resize) as resize:
+        medium = pyramid.resize(width=200)
+        small = pyramid.resize(width=100)
+        assert pyramid.resize(width=100) is small
+    assert resize.call_count == 2
+    assert resize.call_args_list[1][0][0] is medium
+    assert small.shape[:2] == rv.resize(kitten, width=100).shape[:2]
+    diff = np.abs(small.astype(int) - rv.resize(kitten, width=100)).mean()
+    assert diff < 2
+
+
+def test_levels_halve_the_image():
+    pyramid = rv.Pyramid(kitten)
+    assert pyramid.level(0) is kitten
+    assert pyramid.level(2).shape[1] == ((w + 1) // 2 + 1) // 2
+    levels = pyramid.levels(min_width=w // 4)
+    assert [n for n, _ in levels] == [2, 1, 0]
+    assert levels[0][1] is pyramid.level(2)
+
+
+def test_frames_share_their_pyramid():
+    frame = rv.Frame(kitten)
+    small = frame.resized(width=100)
+    assert small is frame.resized(width=100)
+    assert np.may_share_memory(frame.pyramid.resize(width=100), small)
+
+
+def test_resize_of_a_frame_is_a_new_image():
+    frame = rv.Frame(kitten)
+    shared = frame.resized(width=100)
+    small = rv.resize(frame, width=100)
+    assert not np.may_share_memory(small, shared)
+    assert (small == rv.resize(kitten, width=100)).all()
@@ -0,0 +1,48 @@
+"""
+pylint tests, run from main robovision directory with `pytest`
+"""
+import cv2
+import numpy as np
+import pickle
+import sys
+from os import path
+sys.path.append(path.dirname(path.dirname(path.abspath(__file__))))
+from robovision import robovision as rv
+
+kitten = cv2.imread('tests/kitten.jpg')
+
+
+def test_write_and_get():
+    ring = rv.SharedFrameRing(shape=kitten.shape, slots=2)
+    slot, seq = ring.write(kitten)
+    frame = ring.get(slot, seq)
+    assert seq == 1
+    assert np.array_equal(frame, kitten)
+    assert frame.flags.writeable is False
+    ring.close()
+    ring.unlink()
+
+
+def test_slot_reuse_is_detected():
+    ring = rv.SharedFrameRing(shape=kitten.shape, slots=2)
+    slot, seq = ring.write(kitten)
+    ring.write(kitten)
+    assert ring.is_valid(slot, seq)
+    ring.write(kitten)
+    assert not ring.is_valid(slot, seq)
+    assert ring.get(slot, seq) is None
+    ring.close()
+    ring.unlink()
+
+
+def test_attach_by_pickle():
+    ring = rv.SharedFrameRing(shape=(4, 4), slots=2)
+    slot, buffer = ring.next_slot()
+    buffer[:] = 7
+    seq = ring.commit(slot)
+    other = pickle.loads(pickle.dumps(ring))
+    assert other.name == ring.name
+    assert other.get(slot, seq).sum() == 7 * 16
+    other.close()
+    ring.close()
+    ring.unlink()
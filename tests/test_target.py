@@ -0,0 +1,77 @@
+"""
+pylint tests, run from main robovision directory with `pytest`
+"""
+import cv2
+import numpy as np
+import sys
+from os import path
+sys.path.append(path.dirname(path.dirname(path.abspath(__file__))))
+from robovision import robovision as rv
+
+
+def scene(x, y):
+    """
+    Black 640x480 image with a 40x30 green target at x, y
+    """
+    image = np.zeros((480, 640, 3), np.uint8)
+    cv2.rectangle(image, (x, y), (x + 39, y + 29), (0, 255, 0), -1)
+    return image
+
+
+def green_target():
+    target = rv.Target()
+    target.set_color_range(lower=(50, 100, 100), upper=(70, 255, 255))
+    return target
+
+
+def full_frame_rectangle(image):
+    return rv.Target.get_rectangle(green_target().get_contours(image)[0])
+
+
+def test_static_roi_returns_full_frame_coordinates():
+    target = green_target()
+    target.set_roi((400, 300, 200, 150))
+    contours = target.get_contours(scene(450, 350))
+    assert len(contours) == 1
+    assert target.get_rectangle(contours[0]) == full_frame_rectangle(scene(450, 350))
+
+
+def test_static_roi_falls_back_to_full_frame():
+    target = green_target()
+    target.set_roi((400, 300, 200, 150))
+    contours = target.get_contours(scene(50, 50))
+    assert target.get_rectangle(contours[0]) == full_frame_rectangle(scene(50, 50))
+    target.set_roi((400, 300, 200, 150), fallback=False)
+    assert len(target.get_contours(scene(50, 50))) == 0
+
+
+def test_tracked_roi_follows_the_target():
+    target = green_target()
+    target.set_roi(track=True)
+    assert target.roi is None
+    target.get_contours(scene(100, 100))
+    x, y, w, h = target.roi
+    assert x <= 100 and y <= 100 and x + w >= 140 and y + h >= 130
+    assert w * h < 640 * 480 / 4
+    contours = target.get_contours(scene(110, 105))
+    assert target.get_rectangle(contours[0]) == full_frame_rectangle(scene(110, 105))
+    # lost: found again by searching the whole frame
+    contours = target.get_contours(scene(500, 400))
+    assert target.get_rectangle(contours[0]) == full_frame_rectangle(scene(500, 400))
+    assert target.roi[0] > 400
+    target.get_contours(np.zeros((480, 640, 3), np.uint8))
+    assert target.roi is None
+
+
+def test_preprocessor_roi():
+    pp = rv.Preprocessor()
+    pp.add_processor(cv2.cvtColor, args=(cv2.COLOR_BGR2GRAY,))
+    pp.set_roi((600, 400, 100, 100))
+    img = pp.preprocess(scene(0, 0))
+    assert img.shape == (80, 40)
+    assert pp.last_roi == (600, 400, 40, 80)
+    target = green_target()
+    target.set_roi(track=True)
+    target.get_contours(scene(100, 100))
+    pp.set_roi(lambda: target.roi)
+    assert pp.preprocess(scene(100, 100)).shape == target.roi[:1:-1]
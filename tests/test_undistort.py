@@ -0,0 +1,79 @@
+"""
+pylint tests, run from main robovision directory with `pytest`
+"""
+import cv2
+import numpy as np
+import sys
+from os import path
+sys.path.append(path.dirname(path.dirname(path.abspath(__file__))))
+from robovision import robovision as rv
+from robovision.robovision.core import Object
+
+kitten = cv2.imread('tests/kitten.jpg')
+h, w = kitten.shape[:2]
+cam_matrix = np.array([[w, 0., w / 2.], [0., w, h / 2.], [0., 0., 1.]])
+dist_coeff = np.array([-0.3, 0.1, 0.001, 0.001, 0.])
+
+
+def undistort(image):
+    new_matrix, _ = cv2.getOptimalNewCameraMatrix(cam_matrix, dist_coeff, (w, h), 1, (w, h))
+    return cv2.undistort(image, cam_matrix, dist_coeff, None, new_matrix)
+
+
+def test_undistorter_matches_cv2_undistort():
+    undistorter = rv.Undistorter(cam_matrix, dist_coeff)
+    assert (undistorter.undistort(kitten) == undistort(kitten)).all()
+    assert undistorter.maps((w, h))[0] is undistorter.maps((w, h))[0]
+
+
+def test_undistorter_crops_to_valid_region():
+    undistorter = rv.Undistorter(cam_matrix, dist_coeff, crop=True)
+    x, y, rw, rh = undistorter.roi((w, h))
+    assert undistorter.undistort(kitten).shape == (rh, rw, 3)
+
+
+def test_undistorter_writes_into_dst():
+    dst = np.empty_like(kitten)
+    result = rv.Undistorter(cam_matrix, dist_coeff).undistort(kitten, dst=dst)
+    assert result is dst
+
+
+def test_flatten_uses_cached_maps():
+    assert (rv.flatten(kitten, cam_matrix, dist_coeff) == undistort(kitten)).all()
+    params = Object()
+    params.mtx, params.dist = cam_matrix, dist_coeff
+    assert (rv.flatten(kitten, params) == undistort(kitten)).all()
+
+
+def test_undistorted_points_match_flattened_image():
+    image = np.zeros((h, w), np.uint8)
+    cv2.circle(image, (30, 25), 2, 255, -1)
+    ys, xs = np.nonzero(rv.flatten(image, cam_matrix, dist_coeff) > 127)
+    point = rv.undistort_points(np.array([[30, 25]]), cam_matrix, dist_coeff, image_size=(w, h))
+    assert point.shape == (1, 2)
+    assert abs(point[0, 0] - xs.mean()) < 1 and abs(point[0, 1] - ys.mean()) < 1
+    undistorter = rv.Undistorter(cam_matrix, dist_coeff)
+    assert np.allclose(undistorter.undistort_points(np.array([[30, 25]]), (w, h)), point)
+
+
+def test_undistort_contours_keeps_their_shape():
+    contour = np.array([[[10, 10]], [[60, 10]], [[60, 40]], [[10, 40]]], np.int32)
+    corrected = rv.undistort_points([contour, contour], cam_matrix, dist_coeff)
+    assert len(corrected) == 2
+    assert corrected[0].shape == contour.shape and corrected[0].dtype == np.float32
+
+
+def test_target_undistorts_contours():
+    contour = np.array([[[10, 10]], [[60, 10]], [[60, 40]], [[10, 40]]], np.int32)
+    target = rv.Target()
+    assert target.undistort_contour(contour) is contour
+    target.set_camera_params(cam_matrix, dist_coeff)
+    corrected = target.undistort_contour(contour)
+    expected = rv.undistort_points(contour, cam_matrix, dist_coeff)
+    assert np.allclose(corrected, expected)
+    assert target.get_rectangle(corrected) != (10, 10, 51, 31)
+    assert target.get_extreme_points(corrected)[0] == tuple(expected[expected[:, :, 0].argmin()][0])
+    # the geometry methods themselves don't depend on the camera parameters
+    assert target.get_rectangle(contour) == rv.Target.get_rectangle(contour) == (10, 10, 51, 31)
+    target.set_camera_params()
+    assert target.undistort_contour(contour) is contour
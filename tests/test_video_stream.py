@@ -0,0 +1,237 @@
+"""
+pylint tests, run from main robovision directory with `pytest`
+"""
+import asyncio
+import cv2
+import numpy as np
+import sys
+import threading
+import time
+from os import path
+from unittest.mock import MagicMock, patch
+sys.path.append(path.dirname(path.dirname(path.abspath(__file__))))
+from robovision import robovision as rv
+from robovision.robovision.video.abstract_cam import AbstractCam
+
+kitten = cv2.imread('tests/kitten.jpg')
+
+
+class FakeCam(AbstractCam):
+    """
+    Stand-in source that publishes `count` copies of the kitten image
+    """
+    def __init__(self, count=5, interval=0.01, buffers=0):
+        super(FakeCam, self).__init__(buffers=buffers)
+        self.count = count
+        self.interval = interval
+
+    def start(self):
+        self.ct = threading.Thread(target=self._capture_image_thread)
+        self.ct.daemon = True
+        self.running = True
+        self.ct.start()
+
+    def stop(self):
+        self.running = False
+        self._wake_waiters()
+        self.ct.join()
+
+    def read_frame(self):
+        if self.running is True:
+            return self._get_frame()
+
+    def _capture_image_thread(self):
+        for _ in range(self.count):
+            if self.running is False:
+                break
+            time.sleep(self.interval)
+            buffer = self._next_buffer()
+            if buffer is None:
+                buffer = kitten.copy()
+            else:
+                np.copyto(buffer, kitten)
+            self._set_frame(buffer)
+
+
+def get_stream(**kwargs):
+    vs = rv.VideoStream()
+    vs.source = FakeCam(**kwargs)
+    return vs
+
+
+def test_read_frame_wait_new():
+    vs = get_stream(count=3)
+    vs.start()
+    seqs = []
+    for _ in range(3):
+        frame = vs.read_frame(wait_new=True, timeout=1)
+        assert frame.shape == kitten.shape
+        seqs.append(vs.last_seq)
+    vs.stop()
+    assert seqs == [1, 2, 3]
+
+
+def test_read_frame_wait_new_timeout():
+    vs = get_stream(count=1)
+    vs.start()
+    assert vs.read_frame(wait_new=True, timeout=1) is not None
+    assert vs.read_frame(wait_new=True, timeout=0.05) is None
+    vs.stop()
+
+
+def test_ring_buffers_are_reused():
+    vs = get_stream(count=10, interval=0.005, buffers=3)
+    vs.start()
+    seen = set()
+    for _ in range(10):
+        with vs.lease_frame(wait_new=True, timeout=1) as lease:
+            seen.add(lease.frame.base.ctypes.data)
+    vs.stop()
+    assert len(seen) <= 3
+
+
+def test_leased_frame_is_not_overwritten():
+    vs = get_stream(count=6, interval=0.005, buffers=2)
+    vs.start()
+    lease = vs.lease_frame(wait_new=True, timeout=1)
+    assert lease.frame.flags.writeable is False
+    held = lease.frame.base
+    while vs.read_frame(wait_new=True, timeout=0.2) is not None:
+        assert vs.source.current_frame is not held
+    lease.release()
+    vs.stop()
+
+
+def test_leaked_leases_dont_grow_the_ring_forever():
+    vs = get_stream(count=10, interval=0.005, buffers=2)
+    vs.start()
+    leases = []
+    while True:
+        lease = vs.lease_frame(wait_new=True, timeout=0.2)
+        if lease is None:
+            break
+        leases.append(lease)
+    vs.stop()
+    assert len(vs.source._ring.buffers) == 4
+    assert vs.source.dropped_frames > 0
+    for lease in leases:
+        lease.release()
+
+
+def test_frames_yields_each_frame_once():
+    vs = get_stream(count=5)
+    seqs = []
+    for frame in vs.frames(timeout=0.2):
+        seqs.append(vs.last_seq)
+    vs.stop()
+    assert seqs == sorted(set(seqs))
+    assert seqs[-1] == 5
+
+
+def test_frames_queue_policy():
+    vs = get_stream(count=5, interval=0.001)
+    vs.start()
+    frames = list(vs.frames(drop="queue", timeout=0.2))
+    vs.stop()
+    assert 0 < len(frames) <= 5
+
+
+def test_frames_max_fps():
+    vs = get_stream(count=20, interval=0.005)
+    frames = list(vs.frames(max_fps=50, timeout=0.2))
+    vs.stop()
+    assert len(frames) < 20
+
+
+def test_aframes():
+    vs = get_stream(count=5)
+
+    async def consume():
+        seqs = []
+        async for frame in vs.aframes():
+            seqs.append(vs.last_seq)
+            if vs.last_seq == 5:
+                vs.stop()
+        return seqs
+
+    seqs = asyncio.run(asyncio.wait_for(consume(), 2))
+    assert seqs[-1] == 5
+    assert seqs == sorted(set(seqs))
+
+
+def test_stats():
+    vs = get_stream(count=0)
+    vs.start()
+    publish = vs.source._set_frame
+    publish(kitten)
+    vs.read_frame()
+    vs.read_frame()
+    for _ in range(3):
+        publish(kitten)
+    vs.read_frame(wait_new=True, timeout=1)
+    stats = vs.stats()
+    vs.stop()
+    assert stats["captured"] == 4
+    assert stats["delivered"] == 3
+    assert stats["duplicates"] == 1
+    assert stats["dropped"] == 2
+    assert stats["capture_fps"] > 0
+    assert 0 <= stats["age_p50"] <= stats["age_max"]
+
+
+def test_webcam_settings_applied_and_reported():
+    reported = {
+        cv2.CAP_PROP_FRAME_WIDTH: 640,
+        cv2.CAP_PROP_FRAME_HEIGHT: 480,
+        cv2.CAP_PROP_FPS: 30.,
+        cv2.CAP_PROP_FOURCC: cv2.VideoWriter_fourcc(*"MJPG"),
+        cv2.CAP_PROP_BUFFERSIZE: 1,
+        cv2.CAP_PROP_EXPOSURE: 50.,
+    }
+    cam = MagicMock()
+    cam.read.return_value = (False, None)
+    cam.get.side_effect = reported.get
+    vs = rv.VideoStream(resolution=(640, 480), fps=60, fourcc="MJPG", buffer_size=1,
+                        exposure=50)
+    with patch.object(cv2, "VideoCapture", return_value=cam):
+        vs.start()
+    vs.stop()
+    cam.set.assert_any_call(cv2.CAP_PROP_FOURCC, cv2.VideoWriter_fourcc(*"MJPG"))
+    cam.set.assert_any_call(cv2.CAP_PROP_FRAME_WIDTH, 640)
+    cam.set.assert_any_call(cv2.CAP_PROP_FPS, 60)
+    cam.set.assert_any_call(cv2.CAP_PROP_BUFFERSIZE, 1)
+    cam.set.assert_any_call(cv2.CAP_PROP_EXPOSURE, 50)
+    settings = vs.camera_settings()
+    assert settings["resolution"] == (640, 480)
+    assert settings["fps"] == 30.
+    assert settings["fourcc"] == "MJPG"
+
+
+def test_webcam_auto_exposure_values_depend_on_backend():
+    for backend, exposure, expected in (("V4L2", "auto", 3), ("V4L2", 50, 1),
+                                        ("DSHOW", "auto", 0.75), ("DSHOW", 50, 0.25),
+                                        ("MSMF", "auto", None), ("MSMF", 50, None)):
+        cam = MagicMock()
+        cam.read.return_value = (False, None)
+        cam.getBackendName.return_value = backend
+        vs = rv.VideoStream(exposure=exposure)
+        with patch.object(cv2, "VideoCapture", return_value=cam):
+            vs.start()
+        vs.stop()
+        modes = [call[0][1] for call in cam.set.call_args_list
+                 if call[0][0] == cv2.CAP_PROP_AUTO_EXPOSURE]
+        assert modes == ([] if expected is None else [expected])
+        if exposure != "auto":
+            cam.set.assert_any_call(cv2.CAP_PROP_EXPOSURE, 50)
+
+
+def test_webcam_keeps_driver_resolution_by_default():
+    cam = MagicMock()
+    cam.read.return_value = (False, None)
+    vs = rv.VideoStream()
+    with patch.object(cv2, "VideoCapture", return_value=cam):
+        vs.start()
+    vs.stop()
+    set_props = [call[0][0] for call in cam.set.call_args_list]
+    assert cv2.CAP_PROP_FRAME_WIDTH not in set_props
+    assert cv2.CAP_PROP_FRAME_HEIGHT not in set_props
@@ -0,0 +1,57 @@
+"""
+pylint tests, run from main robovision directory with `pytest`
+"""
+import cv2
+import sys
+import threading
+import time
+from os import path
+from unittest.mock import MagicMock, patch
+sys.path.append(path.dirname(path.dirname(path.abspath(__file__))))
+from robovision import robovision as rv
+
+kitten = cv2.imread('tests/kitten.jpg')
+
+
+def make_video(filename, count=5):
+    h, w = kitten.shape[:2]
+    writer = cv2.VideoWriter(filename, cv2.VideoWriter_fourcc(*"MJPG"), 30, (w, h))
+    for _ in range(count):
+        writer.write(kitten)
+    writer.release()
+    return filename
+
+
+def test_read_frames(tmp_path):
+    video = make_video(str(tmp_path / "kitten.avi"))
+    group = rv.VideoStreamGroup(sources=[video, video], timeout=2)
+    frames, timestamps, skew = group.read_frames()
+    group.stop()
+    assert len(frames) == 2
+    assert all(f.shape == kitten.shape for f in frames)
+    assert skew == max(timestamps) - min(timestamps)
+
+
+def test_missing_source_returns_none(tmp_path):
+    video = make_video(str(tmp_path / "kitten.avi"))
+    group = rv.VideoStreamGroup(sources=[video, str(tmp_path / "missing.avi")], timeout=2)
+    frames, timestamps, skew = group.read_frames()
+    group.stop()
+    assert frames[0] is not None
+    assert frames[1] is None
+    assert skew == 0
+
+
+def test_stop_doesnt_wait_forever_for_a_stalled_camera():
+    stalled = threading.Event()
+    cam = MagicMock()
+    cam.grab.side_effect = lambda: stalled.wait(5)
+    cam.retrieve.return_value = (False, None)
+    group = rv.VideoStreamGroup(sources=[0], timeout=0.1)
+    with patch.object(cv2, "VideoCapture", return_value=cam):
+        assert group.read_frames().frames == (None,)
+    started = time.monotonic()
+    group.stop()
+    assert time.monotonic() - started < 1
+    cam.release.assert_not_called()
+    stalled.set()